@@ -0,0 +1,86 @@
+# Libraries
+import sys
+import csv
+import importlib
+import tracemalloc
+import place_and_route
+from concurrent.futures import ProcessPoolExecutor
+
+# Custom files
+from instrumentation import measure, reset_peak_rss, get_peak_rss_in_mb
+from workspace import Workspace
+import config as cfg
+
+# Benchmark cases: High-radix topologies, whose wide routing channels dominate the time and memory of
+# placement and routing, and a chip with 1024 tiles, as (name, generator, rows, cols, topology config)
+cases = [
+	("flattened_butterfly_8x8", "generate_flattened_butterfly", 8, 8, []),
+	("slimnoc_8x16", "generate_slimnoc", 8, 16, [8, 8, 16]),
+	("flattened_butterfly_16x16", "generate_flattened_butterfly", 16, 16, []),
+	("custom_32x32", "generate_custom", 32, 32, [[2, 4], [2, 4]]),
+]
+
+# Architectural parameters shared by all cases (those of the 35 MGE tiles of the DAC'23 paper)
+tile_area = 35000000
+n_endpoints = 1
+tech = "gf22"
+prot = "axi"
+bw = 512
+freq = 1200000000
+
+# Generate one case and measure it (runs in a fresh process, such that the peak memory only covers this case)
+# trace:		Also measure the peak memory of all Python and NumPy allocations (tracemalloc, slows down the run)
+# symmetric:	Use the symmetric mode of place_and_route
+# iterations:	Maximum number of negotiated-congestion iterations of place_and_route
+def run_case(workspace, case, trace, symmetric, iterations):
+	(name, generator, rows, cols, config) = case
+	workspace.activate()
+	place_and_route.use_symmetry = symmetric
+	place_and_route.negotiation_iterations = iterations
+	generator = importlib.import_module(generator)
+	reset_peak_rss()
+	base_rss_in_mb = get_peak_rss_in_mb()
+	tracemalloc.start() if trace else 0
+	(result, usage) = measure(generator.generate, name, tile_area, n_endpoints, tech, prot, bw, freq, rows, cols, config)
+	usage["base_rss_in_mb"] = base_rss_in_mb
+	usage["peak_traced_in_mb"] = tracemalloc.get_traced_memory()[1] / 2**20 if trace else None
+	tracemalloc.stop() if trace else 0
+	return usage
+
+# Benchmark the time and peak memory of generating (mostly placing and routing) the given cases (None = all
+# cases). The results are written to benchmark_place_and_route.csv in the evaluation results and returned.
+def benchmark(names = None, trace = False, symmetric = False, iterations = 0):
+	selected = [case for case in cases if names == None or case[0] in names]
+	columns = ["case", "wall_time_in_s", "cpu_time_in_s", "base_rss_in_mb", "peak_rss_in_mb", "peak_traced_in_mb"]
+	results = []
+	workspace = Workspace("benchmark")
+	try:
+		for case in selected:
+			with ProcessPoolExecutor(max_workers = 1) as pool:
+				usage = pool.submit(run_case, workspace, case, trace, symmetric, iterations).result()
+			usage["case"] = case[0]
+			results.append(usage)
+	finally:
+		workspace.remove()
+	with open(cfg.eval_results + "benchmark_place_and_route.csv", "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(columns)
+		for usage in results:
+			writer.writerow([usage[col] for col in columns])
+	print("%-28s %12s %12s %15s %15s %15s" % ("Case", "Wall [s]", "CPU [s]", "Base RSS [MB]", "Peak RSS [MB]", "Traced [MB]"))
+	for usage in results:
+		traced = "%15.1f" % usage["peak_traced_in_mb"] if usage["peak_traced_in_mb"] != None else "%15s" % "-"
+		print("%-28s %12.1f %12.1f %15.1f %15.1f %s" % (usage["case"], usage["wall_time_in_s"], usage["cpu_time_in_s"], \
+				usage["base_rss_in_mb"], usage["peak_rss_in_mb"], traced))
+	return results
+
+### Main ###
+if __name__ == "__main__":
+	args = sys.argv
+	if "-h" in args or "--help" in args:
+		print("Usage: python benchmark_place_and_route.py [--trace] [--symmetric] [--negotiate=<iterations>] [<case> ...]")
+		print("Cases: " + ", ".join([case[0] for case in cases]))
+		sys.exit()
+	iterations = [int(arg.split("=")[1]) for arg in args[1:] if arg.startswith("--negotiate=")]
+	names = [arg for arg in args[1:] if arg not in ["--trace", "--symmetric"] and not arg.startswith("--negotiate=")]
+	benchmark(names if len(names) > 0 else None, "--trace" in args, "--symmetric" in args, iterations[-1] if len(iterations) > 0 else 0)
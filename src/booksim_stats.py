@@ -0,0 +1,194 @@
+# Libraries
+import re
+import numpy as np
+from scipy import stats as sp_stats
+
+# Metrics that BookSim reports per traffic class in its overall statistics
+# (label in BookSim output, attribute name)
+metrics = [
+	("Packet latency", "packet_latency"),
+	("Network latency", "network_latency"),
+	("Flit latency", "flit_latency"),
+	("Fragmentation", "fragmentation"),
+	("Injected packet rate", "injected_packet_rate"),
+	("Accepted packet rate", "accepted_packet_rate"),
+	("Injected flit rate", "injected_flit_rate"),
+	("Accepted flit rate", "accepted_flit_rate"),
+	("Injected packet size", "injected_packet_size"),
+	("Accepted packet size", "accepted_packet_size"),
+	("Hops", "hops"),
+]
+
+# Latency that is reported for unstable simulations
+unstable_latency = 1000
+
+# Columns of the BookSim results files (one row per load and traffic class)
+csv_columns = ["load", "latency", "latency_ci", "seeds", "class", "status"]
+csv_columns += [name + "_" + stat for (label, name) in metrics for stat in ["average", "minimum", "maximum"]]
+
+# Average, minimum and maximum of one metric
+class Metric:
+	def __init__(self, average = None, minimum = None, maximum = None):
+		self.average = average
+		self.minimum = minimum
+		self.maximum = maximum
+
+# Overall statistics of one traffic class
+class ClassStats:
+	def __init__(self, traffic_class):
+		self.traffic_class = traffic_class
+		self.packet_latency = Metric()
+		self.network_latency = Metric()
+		self.flit_latency = Metric()
+		self.fragmentation = Metric()
+		self.injected_packet_rate = Metric()
+		self.accepted_packet_rate = Metric()
+		self.injected_flit_rate = Metric()
+		self.accepted_flit_rate = Metric()
+		self.injected_packet_size = Metric()
+		self.accepted_packet_size = Metric()
+		self.hops = Metric()
+
+# Statistics of one BookSim simulation, parsed from its standard output
+# status:		"ok" (statistics available), "unstable" (network saturated) or "failed"
+# classes:		Overall statistics per traffic class
+# time_taken:	Simulated cycles (including warmup and draining)
+# run_time:		Wall-clock time reported by BookSim in seconds
+# abort_reason:	Why the simulation was killed before it completed (see run_booksim.supervise)
+# log:			Lowest 50 lines of the output (for logfiles and the results database)
+# n_seeds:		Number of simulations with different seeds that the statistics are based on
+class BookSimStats:
+	def __init__(self, output, abort_reason = None):
+		self.n_seeds = 1
+		self.status = "failed"
+		self.classes = {}
+		self.time_taken = None
+		self.run_time = None
+		self.abort_reason = abort_reason
+		self.log = "".join([line + "\n" for line in output.split("\n")[-50:]])
+		self.parse(output)
+		# Exceeding the latency bound means that the network is saturated, all other aborts are failures
+		if abort_reason == "latency":
+			self.status = "unstable"
+		elif abort_reason in ["timeout", "memory", "cancelled"]:
+			self.status = "failed"
+
+	# Parse the output of BookSim
+	def parse(self, output):
+		labels = {label : name for (label, name) in metrics}
+		is_overall = False
+		cls = None
+		metric = None
+		for line in output.splitlines():
+			if "Simulation unstable" in line:
+				self.status = "unstable"
+			elif line.startswith("Time taken is"):
+				self.time_taken = int(line.split()[3])
+			elif line.startswith("Total run time"):
+				self.run_time = float(line.split()[3])
+			elif line.startswith("====== Overall Traffic Statistics"):
+				is_overall = True
+			elif not is_overall:
+				continue
+			elif re.match(r"^====== Traffic class \d+ ======", line):
+				cls = ClassStats(int(line.split()[3]))
+				self.classes[cls.traffic_class] = cls
+				metric = None
+			elif cls != None:
+				match = re.match(r"^(\S.*?) average\s*=\s*(\S+)", line)
+				if match:
+					metric = getattr(cls, labels[match.group(1)]) if match.group(1) in labels else None
+					if metric != None:
+						metric.average = float(match.group(2))
+					continue
+				match = re.match(r"^\s+(minimum|maximum)\s*=\s*(\S+)", line)
+				if match and metric != None:
+					setattr(metric, match.group(1), float(match.group(2)))
+		if self.status != "unstable" and 0 in self.classes and self.classes[0].packet_latency.average != None:
+			self.status = "ok"
+
+	# Packet latency as used throughout the toolchain (unstable simulations are assigned a fixed high latency)
+	def get_latency(self, traffic_class = 0):
+		if self.status == "unstable":
+			return unstable_latency
+		elif self.status == "ok":
+			return self.classes[traffic_class].packet_latency.average
+		else:
+			return None
+
+	# Half-width of the confidence interval of the latency (None for a single simulation)
+	def get_latency_ci(self, traffic_class = 0):
+		return None
+
+	# Rows for the BookSim results file (one per traffic class)
+	def to_csv_rows(self, load):
+		rows = []
+		for traffic_class in (sorted(self.classes) if self.status == "ok" else [0]):
+			row = [load, self.get_latency(traffic_class), self.get_latency_ci(traffic_class), self.n_seeds, traffic_class, self.status]
+			for (label, name) in metrics:
+				metric = getattr(self.classes[traffic_class], name) if self.status == "ok" else Metric()
+				row += [metric.average, metric.minimum, metric.maximum]
+			rows.append(row)
+		return rows
+
+# Statistics of replicated BookSim simulations that only differ in their seed. Simulations that
+# failed are ignored. The point is unstable if the majority of the remaining simulations is unstable.
+# Otherwise, all metrics are averaged over the stable simulations (minimum and maximum over all of
+# them) while the latency used throughout the toolchain is the mean latency of all simulations
+# (unstable ones with their fixed high latency) and comes with a confidence interval.
+# runs:			Statistics of the individual simulations
+# confidence:	Confidence level of the interval
+class ReplicatedStats(BookSimStats):
+	def __init__(self, runs, confidence = 0.95):
+		self.runs = runs
+		self.confidence = confidence
+		self.n_seeds = len(runs)
+		self.status = "failed"
+		self.classes = {}
+		self.abort_reason = None
+		self.log = "".join(["--- Seed %d ---\n%s" % (seed, run.log) for (seed, run) in enumerate(runs)])
+		self.completed = [run for run in runs if run.status != "failed"]
+		stable = [run for run in self.completed if run.status == "ok"]
+		times_taken = [run.time_taken for run in stable if run.time_taken != None]
+		self.time_taken = int(np.mean(times_taken)) if len(times_taken) > 0 else None
+		self.run_time = sum([run.run_time for run in runs if run.run_time != None])
+		if len(self.completed) == 0:
+			return
+		elif 2 * len(stable) < len(self.completed):
+			self.status = "unstable"
+			return
+		self.status = "ok"
+		# Average the metrics of all traffic classes that are reported by all stable simulations
+		for traffic_class in sorted(set.intersection(*[set(run.classes) for run in stable])):
+			cls = ClassStats(traffic_class)
+			for (label, name) in metrics:
+				values = [getattr(run.classes[traffic_class], name) for run in stable]
+				metric = getattr(cls, name)
+				if all([value.average != None for value in values]):
+					metric.average = float(np.mean([value.average for value in values]))
+				if all([value.minimum != None for value in values]):
+					metric.minimum = min([value.minimum for value in values])
+				if all([value.maximum != None for value in values]):
+					metric.maximum = max([value.maximum for value in values])
+			self.classes[traffic_class] = cls
+
+	# Latencies of all completed simulations (unstable ones with their fixed high latency)
+	def get_latencies(self, traffic_class = 0):
+		return [run.get_latency(traffic_class) if run.status == "unstable" or traffic_class in run.classes else None for run in self.completed]
+
+	# Mean latency of all completed simulations
+	def get_latency(self, traffic_class = 0):
+		if self.status != "ok":
+			return BookSimStats.get_latency(self, traffic_class)
+		latencies = [lat for lat in self.get_latencies(traffic_class) if lat != None]
+		return float(np.mean(latencies))
+
+	# Half-width of the confidence interval of the mean latency (Student's t-distribution)
+	def get_latency_ci(self, traffic_class = 0):
+		if self.status != "ok":
+			return None
+		latencies = [lat for lat in self.get_latencies(traffic_class) if lat != None]
+		if len(latencies) < 2:
+			return None
+		sem = np.std(latencies, ddof = 1) / np.sqrt(len(latencies))
+		return float(sp_stats.t.ppf((1 + self.confidence) / 2, len(latencies) - 1) * sem)
@@ -1,23 +1,35 @@
+# Libraries
+import os
+
+# Root directory of the repository: All paths are absolute such that they do not depend on the working
+# directory. Runs can redirect the paths of their artifacts to an isolated workspace (see workspace.py).
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + "/"
+
 # Inputs
-technology_path = "../inputs/technologies/"					# Description of technology node
-protocol_path = "../inputs/protocols/"						# Description of transport protocol
-interposer_path = "../inputs/interposers/"					# Description of interposers
+technology_path = root + "inputs/technologies/"					# Description of technology node
+protocol_path = root + "inputs/protocols/"						# Description of transport protocol
+interposer_path = root + "inputs/interposers/"					# Description of interposers
+experiment_path = root + "inputs/experiments/"					# Declarative experiment specifications
 
 # Intermediate files
-unembedded_tile_path = "../components/tiles/"				# Description of tile
+unembedded_tile_path = root + "components/tiles/"				# Description of tile
 
 # Embedded components
-tile_path = "../components_embedded/tiles/"					# Embedded tiles
-module_path = "../components_embedded/modules/"				# Embedded modules
-stacked_chip_path = "../components_embedded/stacked_chips/"	# Embedded stacked chips 
+tile_path = root + "components_embedded/tiles/"					# Embedded tiles
+module_path = root + "components_embedded/modules/"				# Embedded modules
+stacked_chip_path = root + "components_embedded/stacked_chips/"	# Embedded stacked chips 
 
 # BookSim
-bs_topologies = "../booksim2/src/anynet/"					# Topologies for BookSim
-bs_results = "../bs_results/"								# BookSim simulations results
-bs_logs = "../bs_logs/"										# BookSim simulation logs
+bs_binary = root + "booksim2/src/booksim"						# BookSim executable
+bs_config = root + "booksim2/src/anynet.conf"					# Base configuration for BookSim
+bs_topologies = root + "booksim2/src/anynet/"					# Topologies for BookSim
+bs_results = root + "bs_results/"								# BookSim simulations results
+bs_logs = root + "bs_logs/"										# BookSim simulation logs
+bs_cache = root + "bs_cache/"									# Cached outputs of BookSim simulations
 
 # Evaluation
-eval_results ="../eval_results/"							# Evaluation results
+eval_results =root + "eval_results/"							# Evaluation results
+results_db = root + "eval_results/results.db"					# Database with all simulation and evaluation results
 
 # Plots
-plots = "../plots/"											# Plots
+plots = root + "plots/"											# Plots
@@ -139,7 +139,7 @@ def embed_tile_in_grid(tile_name, tech_name, prot_name, bw, freq):
 			if port_cnt[face] > port_limit[face]:
 				msg = "Not able to fit all ports on %s-faces of tile"
 				msg %= face
-				error(__file__, msg)
+				error(__file__, msg, params = {"tile" : tile_name, "face" : face, "ports" : port_cnt[face], "port_limit" : port_limit[face]})
 		# ...Compute port locations
 		face_start= {	"north" : 1, 
 						"east" : 1, 
@@ -1,17 +1,33 @@
 # Libraries
-import sys
 import os
 
-# Display error message
-def error(file, message, do_terminate = True):
+# Error raised by the toolchain instead of terminating the process, such that batch runners can record
+# the failure of one experiment and carry on with the others
+# module:	Name of the file in which the error occurred
+# message:	Description of the error
+# params:	Parameters that caused the error (dictionary, may be empty)
+class ToolchainError(Exception):
+	def __init__(self, file, message, params = None):
+		super().__init__(file, message, params)
+		self.module = os.path.basename(file)
+		self.message = message
+		self.params = params if params != None else {}
+
+	def __str__(self):
+		params = ", ".join(["%s=%s" % (param, self.params[param]) for param in self.params])
+		return "%s: %s" % (self.module, self.message) + (" (%s)" % params if len(params) > 0 else "")
+
+# Display error message and raise a ToolchainError
+# params:	Parameters that caused the error (attached to the exception)
+def error(file, message, do_terminate = True, params = None):
 	file = os.path.basename(file)
 	print("ERROR in %s: %s" % (file, message))
 	if do_terminate:
-		sys.exit()
+		raise ToolchainError(file, message, params)
 
 # Display warning message
 def warning(file, message, do_terminate = False):
 	file = os.path.basename(file)
 	print("WARNING in %s: %s" % (file, message))
 	if do_terminate:
-		sys.exit()
+		raise ToolchainError(file, message)
@@ -0,0 +1,115 @@
+# Libraries
+import sys
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import shortest_path
+
+# Custom files
+from translate_lm_to_bs import get_router_graph
+from module import Module
+import sim_cache
+import config as cfg
+
+# Analytical estimate of the performance that BookSim reports for a logical model under uniform random
+# traffic with minimal routing (anynet routes on shortest paths in hops, ties are broken randomly).
+# The estimate is meant as a fast first-pass filter, not as a replacement for the simulation.
+# latency:		Zero-load packet latency in cycles (hop-minimal paths, fastest one if there are multiple)
+# throughput:	Upper bound on the saturation throughput in flits per cycle and endpoint, derived from the
+#				most loaded channel when traffic is split evenly among all hop-minimal paths
+# hops:			Average number of router-to-router hops
+def estimate_performance(vertices, edges, edge_delays):
+	(router_list, endpoint_list, successors) = get_router_graph(vertices, edges, edge_delays)
+	router_idx = {router : idx for (idx, router) in enumerate(router_list)}
+	# Channels between routers (with the same delay as in the anynet file) and endpoints per router
+	channels = {}
+	endpoints = np.zeros(len(router_list))
+	for router in router_list:
+		for (succ, delay) in successors[router]:
+			if succ[-1] == "r":
+				channels[(router_idx[router], router_idx[succ])] = max(1, int(round(delay)))
+			else:
+				endpoints[router_idx[router]] += 1
+	return estimate_router_graph(channels, endpoints)
+
+# Analytical estimate (see estimate_performance) for a graph of routers that is given directly
+# channels:		Dictionary with the delay in cycles of each channel (source router, destination router)
+# endpoints:	Number of endpoints attached to each router
+def estimate_router_graph(channels, endpoints):
+	endpoints = np.array(endpoints, dtype = float)
+	n_routers = len(endpoints)
+	# Router pipeline and packet size from the BookSim configuration
+	bs_params = sim_cache.read_config(cfg.bs_config)
+	router_delay = sum([int(bs_params.get(param, 0)) for param in ["routing_delay", "vc_alloc_delay", "sw_alloc_delay", "st_final_delay"]])
+	packet_size = int(bs_params.get("packet_size", 1))
+	(src, dst) = (np.array([c[0] for c in channels], dtype = int), np.array([c[1] for c in channels], dtype = int))
+	adjacency = csr_matrix((np.ones(len(channels)), (src, dst)), shape = (n_routers, n_routers))
+	# Hop counts and, among the hop-minimal paths, the smallest sum of channel delays: Each channel is
+	# weighted with a large constant plus its delay such that shortest paths minimize hops first.
+	big = 1 + sum(channels.values())
+	delays = np.array([channels[c] for c in channels], dtype = float)
+	weights = csr_matrix((big + delays, (src, dst)), shape = (n_routers, n_routers))
+	hops = shortest_path(adjacency, unweighted = True)
+	channel_delay = shortest_path(weights) - big * hops
+	# Traffic between routers: Every endpoint sends to all other endpoints with the same probability
+	n_endpoints = int(endpoints.sum())
+	demand = np.outer(endpoints, endpoints) - np.diag(endpoints)
+	demand /= max(1, n_endpoints - 1)
+	pairs = demand > 0
+	if np.any(np.isinf(hops[pairs])):
+		return {"latency" : None, "throughput" : 0, "hops" : None}
+	# Zero-load latency: injection and ejection channel, router pipeline at each router, channel
+	# delays and serialization of the packet
+	latency = 2 + (hops + 1) * router_delay + channel_delay + (packet_size - 1)
+	weight = demand[pairs] / demand[pairs].sum()
+	avg_latency = float(np.sum(latency[pairs] * weight))
+	avg_hops = float(np.sum(hops[pairs] * weight))
+	# Number of hop-minimal paths between all pairs of routers (computed level by level)
+	dense = adjacency.toarray()
+	max_level = int(hops[np.isfinite(hops)].max())
+	paths = np.eye(n_routers)
+	for level in range(1, max_level + 1):
+		paths += ((paths * (hops == level - 1)) @ dense) * (hops == level)
+	# Load of each channel per unit of injected traffic: The fraction of paths from s to d that use
+	# channel (u,v) is paths[s,u] * paths[v,d] / paths[s,d] if the channel lies on a minimal path. The
+	# loads are accumulated from the farthest routers towards the sources (as in Brandes' algorithm):
+	# through[s,v] is the traffic from s that reaches v (to be ejected at v or forwarded) divided by
+	# paths[s,v], the load of (u,v) is then the sum over all s with hops[s,v] = hops[s,u] + 1 of
+	# paths[s,u] * through[s,v].
+	safe_paths = np.where(paths > 0, paths, 1)
+	forwarded = np.zeros((n_routers, n_routers))
+	loads = np.zeros((n_routers, n_routers))
+	for level in range(max_level, 0, -1):
+		through = np.where(hops == level, (np.where(pairs, demand, 0) + forwarded) / safe_paths, 0)
+		upstream = paths * (hops == level - 1)
+		forwarded += upstream * (through @ dense.T)
+		loads += upstream.T @ through
+	max_load = float(loads[src, dst].max()) if len(channels) > 0 else 0
+	# Injection and ejection channels limit the throughput to one flit per cycle
+	throughput = min(1.0, 1.0 / max_load) if max_load > 0 else 1.0
+	return {"latency" : avg_latency, "throughput" : throughput, "hops" : avg_hops}
+
+# Select the candidates that lie on or near the Pareto front of the given objectives (all to be
+# minimized). A candidate is dropped if another one is better in all objectives by more than the
+# relative margin. Returns the indices of the selected candidates.
+# costs:	List with one tuple of objective values per candidate
+# margin:	Relative distance from the Pareto front within which candidates are kept
+def get_pareto_candidates(costs, margin = 0.0):
+	costs = np.array(costs, dtype = float)
+	selected = []
+	for i in range(len(costs)):
+		scaled = costs * (1 + margin)
+		dominated = np.all(scaled <= costs[i], axis = 1) & np.any(scaled < costs[i], axis = 1)
+		if not np.any(dominated):
+			selected.append(i)
+	return selected
+
+### Main ###
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("Usage: python estimate_performance.py <module-name>")
+		sys.exit()
+	top = Module(sys.argv[1])
+	estimate = estimate_performance(top.vertices, top.edges, top.edge_delays)
+	print("Zero-load latency: %s cycles" % estimate["latency"])
+	print("Saturation throughput (upper bound): %s flits/cycle/endpoint" % estimate["throughput"])
+	print("Average hops: %s" % estimate["hops"])
@@ -0,0 +1,238 @@
+# Libraries
+import sys
+import os
+import json
+import queue
+import signal
+import threading
+import itertools
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, wait
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Custom files
+from technology import Technology
+from protocol import Protocol
+from run_experiment import run_experiment
+from experiment_spec import load_spec, check_spec, expand_spec, get_output_name
+from workspace import Workspace
+from error import ToolchainError
+import config as cfg
+
+# Port of the service on localhost
+default_port = 8765
+
+# States of a job ("queued", "running", "done" or "failed"), a job in a final state does not change anymore
+final_states = ["done", "failed"]
+
+# Initialization of the warm worker processes: Parse all technology and protocol descriptions once
+# (see the caches in technology.py and protocol.py), the libraries are imported when the process starts.
+# Interrupts are left to the service, which shuts down the workers.
+def warm_up():
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	for file_name in os.listdir(cfg.technology_path):
+		if file_name.endswith(".xml"):
+			Technology(file_name[:-4])
+	for file_name in os.listdir(cfg.protocol_path):
+		if file_name.endswith(".xml"):
+			Protocol(file_name[:-4])
+
+# Long-running service that runs experiment specifications (see experiment_spec.py) one after another.
+# All jobs share warm process pools for placement and routing ("pnr") and for simulations ("sim") and
+# a persistent workspace, such that generated chips are reused by later jobs with the same layout
+# (see generate_stage in run_experiment.py). Results are stored as for run_spec and streamed to clients
+# as soon as an experiment is stored.
+# n_pnr:	Number of worker processes for placement and routing (None = number of CPU cores)
+# n_sim:	Number of worker processes for simulations (None = number of CPU cores)
+# tmpfs:	Create the workspace in memory (see Workspace)
+class ExperimentService:
+	def __init__(self, n_pnr = None, n_sim = None, tmpfs = False):
+		self.workspace = Workspace("service", tmpfs = tmpfs)
+		limits = {"pnr" : n_pnr or os.cpu_count(), "sim" : n_sim or os.cpu_count()}
+		self.pools = {pool : ProcessPoolExecutor(max_workers = limits[pool], initializer = warm_up) for pool in limits}
+		# Start all worker processes right away, such that the first job does not pay for the warm-up
+		for pool in self.pools:
+			wait([self.pools[pool].submit(os.getpid) for i in range(limits[pool])])
+		self.jobs = []
+		self.job_ids = itertools.count()
+		self.queue = queue.Queue()
+		self.condition = threading.Condition()
+		self.worker = threading.Thread(target = self.work, daemon = True)
+		self.worker.start()
+
+	# Validate and enqueue a specification, returns the job (raises a ToolchainError for invalid specifications)
+	def submit(self, spec):
+		check_spec(spec, "submitted job")
+		experiments = list(expand_spec(spec))
+		with self.condition:
+			job = {"id" : next(self.job_ids), "name" : get_output_name(spec), "status" : "queued", "error" : None, \
+					"experiments" : experiments, "settings" : spec.get("settings", {}), "rows" : []}
+			self.jobs.append(job)
+		self.queue.put(job)
+		return job
+
+	# Summary of a job (without its experiments and rows)
+	def get_summary(self, job):
+		with self.condition:
+			return {"id" : job["id"], "name" : job["name"], "status" : job["status"], "error" : job["error"], \
+					"n_experiments" : len(job["experiments"]), "n_rows" : len(job["rows"])}
+
+	# Change the state of a job or add rows to it and wake up the clients that wait for it
+	def update(self, job, status = None, error = None, rows = []):
+		with self.condition:
+			job["status"] = status if status != None else job["status"]
+			job["error"] = error if error != None else job["error"]
+			job["rows"] += rows
+			self.condition.notify_all()
+
+	# Iterate over the rows of a job as they are stored, ends once the job is done or failed
+	def follow(self, job):
+		sent = 0
+		while True:
+			with self.condition:
+				self.condition.wait_for(lambda : len(job["rows"]) > sent or job["status"] in final_states)
+				(rows, status) = (job["rows"][sent:], job["status"])
+			for row in rows:
+				yield row
+			sent += len(rows)
+			if status in final_states:
+				return
+
+	# Run the queued jobs one after another
+	def work(self):
+		while True:
+			job = self.queue.get()
+			if job == None:
+				return
+			self.update(job, status = "running")
+			try:
+				run_experiment(job["experiments"], job["name"], **job["settings"], workspace = self.workspace, pools = self.pools, \
+								on_stored = lambda rows : self.update(job, rows = rows))
+				self.update(job, status = "done")
+			# The service outlives broken jobs
+			except Exception as err:
+				self.update(job, status = "failed", error = str(err))
+
+	# Stop the worker and the process pools and remove the workspace
+	def close(self):
+		self.queue.put(None)
+		for pool in self.pools.values():
+			pool.shutdown(wait = False, cancel_futures = True)
+		self.workspace.remove()
+
+# HTTP interface of the service (on localhost):
+# POST /jobs				Submit a specification (JSON), returns the summary of the new job
+# GET  /jobs				Summaries of all jobs
+# GET  /jobs/<id>			Summary and stored rows of a job
+# GET  /jobs/<id>/stream	Rows of a job as they are stored (one JSON object per line), followed by the
+#							final summary of the job
+class ServiceHandler(BaseHTTPRequestHandler):
+	service = None
+
+	def send_json(self, code, data):
+		body = json.dumps(data, default = str).encode()
+		self.send_response(code)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def get_job(self, job_id):
+		jobs = [job for job in self.service.jobs if str(job["id"]) == job_id]
+		if len(jobs) == 0:
+			self.send_json(404, {"error" : "Unknown job \"%s\"" % job_id})
+			return None
+		return jobs[0]
+
+	def do_POST(self):
+		if self.path.rstrip("/") != "/jobs":
+			self.send_json(404, {"error" : "Unknown path \"%s\"" % self.path})
+			return
+		try:
+			spec = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+			job = self.service.submit(spec)
+		except (ValueError, ToolchainError) as err:
+			self.send_json(400, {"error" : str(err)})
+			return
+		self.send_json(200, self.service.get_summary(job))
+
+	def do_GET(self):
+		parts = self.path.strip("/").split("/")
+		if parts == ["jobs"]:
+			self.send_json(200, [self.service.get_summary(job) for job in self.service.jobs])
+		elif len(parts) == 2 and parts[0] == "jobs":
+			job = self.get_job(parts[1])
+			if job != None:
+				summary = self.service.get_summary(job)
+				with self.service.condition:
+					summary["rows"] = list(job["rows"])
+				self.send_json(200, summary)
+		elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream":
+			job = self.get_job(parts[1])
+			if job != None:
+				# The stream ends when the connection is closed (HTTP/1.0)
+				self.send_response(200)
+				self.send_header("Content-Type", "application/x-ndjson")
+				self.end_headers()
+				for row in self.service.follow(job):
+					self.wfile.write((json.dumps(row, default = str) + "\n").encode())
+					self.wfile.flush()
+				self.wfile.write((json.dumps(self.service.get_summary(job)) + "\n").encode())
+		else:
+			self.send_json(404, {"error" : "Unknown path \"%s\"" % self.path})
+
+	def log_message(self, format, *args):
+		pass
+
+# Run the service until it is interrupted. The port is bound first, such that a port in use does not leave
+# workers or a workspace behind.
+def serve(port = default_port, n_pnr = None, n_sim = None, tmpfs = False):
+	server = ThreadingHTTPServer(("127.0.0.1", port), ServiceHandler)
+	server.daemon_threads = True
+	try:
+		service = ExperimentService(n_pnr, n_sim, tmpfs)
+	except BaseException:
+		server.server_close()
+		raise
+	ServiceHandler.service = service
+	print("Experiment service listening on http://127.0.0.1:%d (workspace: %s)" % (port, service.workspace.root))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		service.close()
+
+# Submit a specification to a running service and print its results as they arrive, returns the final
+# summary of the job
+def submit(file_name, port = default_port):
+	url = "http://127.0.0.1:%d/jobs" % port
+	request = urllib.request.Request(url, data = json.dumps(load_spec(file_name)).encode(), headers = {"Content-Type" : "application/json"})
+	with urllib.request.urlopen(request) as response:
+		job = json.loads(response.read())
+	print("Submitted job %d (%s, %d experiments)" % (job["id"], job["name"], job["n_experiments"]))
+	with urllib.request.urlopen("%s/%d/stream" % (url, job["id"])) as response:
+		for line in response:
+			record = json.loads(line)
+			if "status" in record and "id" in record:
+				job = record
+			elif record.get("status") == "failed":
+				print("%s (%s, %s): failed: %s" % (record["exp_name"], record["traffic"], record["routing"], record["error"]))
+			else:
+				print("%s (%s, %s): area %s mm^2, latency %s cycles, throughput %s" % (record["exp_name"], record["traffic"], \
+						record["routing"], record["total_area"], record["latency"], record["throughput"]))
+	print("Job %d %s" % (job["id"], job["status"]) + (": " + job["error"] if job["error"] != None else ""))
+	return job
+
+### Main ###
+if __name__ == "__main__":
+	args = sys.argv
+	if len(args) < 2 or args[1] not in ["serve", "submit"] or (args[1] == "submit" and len(args) < 3):
+		print("Usage: python experiment_service.py serve [<port>] [<#pnr-workers>] [<#sim-workers>]")
+		print("       python experiment_service.py submit <spec-file> [<port>]")
+		sys.exit()
+	if args[1] == "serve":
+		serve(int(args[2]) if len(args) > 2 else default_port, int(args[3]) if len(args) > 3 else None, int(args[4]) if len(args) > 4 else None)
+	else:
+		submit(args[2], int(args[3]) if len(args) > 3 else default_port)
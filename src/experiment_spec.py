@@ -0,0 +1,136 @@
+# Libraries
+import sys
+import os
+import json
+import tomllib
+import hashlib
+import itertools
+
+# Custom files
+from run_experiment import run_experiment, parameters
+from error import error
+import config as cfg
+
+# Experiment parameters that are integers (specifications may give them as floats, e.g. 1.2e9)
+integer_parameters = ["tiles", "tile_area", "rows", "cols", "endpoints", "bandwidth", "frequency"]
+
+# Keyword arguments of run_experiment that a specification may set
+run_settings = ["n_workers", "search", "tolerance", "speculative", "prefilter", "n_seeds", "n_pnr", "n_sim", "resume", "collect"]
+
+# Sections of a specification
+# name:		Name of the output (results database, csv files), default: spec_<hash of the specification>
+# exp_name:	Template for the experiment names that is filled in with the parameters of each experiment,
+#			default: the first parameter of each axis of the matrix joined by "_"
+# defaults:	Parameters shared by all experiments
+# matrix:	Axes whose values are combined (all combinations, the last axis changes fastest). An axis is
+#			either a parameter with a list of values or a name with a list of parameter groups (dictionaries)
+# exclude:	List of (partial) parameter sets, combinations that match one of them are dropped
+# override:	List of {"match" : <partial parameter set>, "set" : <parameters>}, the parameters are set
+#			for all combinations that match
+# settings:	Keyword arguments for run_experiment (see run_settings)
+# The generator of a topology is given by its module name ("topology_generator", default: generate_<topology>),
+# the chip name defaults to the experiment name and the number of tiles to rows * cols.
+spec_sections = ["name", "exp_name", "defaults", "matrix", "exclude", "override", "settings"]
+
+# Read a specification from a JSON or TOML file (relative to the working directory or cfg.experiment_path)
+def load_spec(file_name):
+	if not os.path.exists(file_name) and os.path.exists(cfg.experiment_path + file_name):
+		file_name = cfg.experiment_path + file_name
+	if file_name.endswith(".json"):
+		with open(file_name, "r") as spec_file:
+			spec = json.load(spec_file)
+	elif file_name.endswith(".toml"):
+		with open(file_name, "rb") as spec_file:
+			spec = tomllib.load(spec_file)
+	else:
+		msg = "Experiment specification \"%s\" needs to be a .json or .toml file"
+		msg %= file_name
+		error(__file__, msg)
+	check_spec(spec, file_name)
+	return spec
+
+# Check the sections and settings of a specification
+# name:		Name of the specification in error messages (e.g. its file)
+def check_spec(spec, name):
+	for section in spec:
+		if section not in spec_sections:
+			msg = "Unknown section \"%s\" in experiment specification \"%s\" (valid sections: %s)"
+			msg %= (section, name, ", ".join(spec_sections))
+			error(__file__, msg)
+	for setting in spec.get("settings", {}):
+		if setting not in run_settings:
+			msg = "Unknown setting \"%s\" in experiment specification \"%s\" (valid settings: %s)"
+			msg %= (setting, name, ", ".join(run_settings))
+			error(__file__, msg)
+
+# Hash of a specification (independent of the order of its keys)
+def get_spec_hash(spec):
+	return hashlib.sha256(json.dumps(spec, sort_keys = True).encode()).hexdigest()
+
+# Name of the output of a specification (or of one of its shards)
+def get_output_name(spec, shard = None):
+	name = spec.get("name", "spec_" + get_spec_hash(spec)[:12])
+	return name + ("_shard%d_of_%d" % shard if shard != None else "")
+
+# Check whether an experiment matches a (partial) parameter set
+def matches(record, partial):
+	return all([param in record and record[param] == partial[param] for param in partial])
+
+# Expand a specification into the experiments that run_experiment consumes. The experiments are
+# generated one at a time (in the order of the matrix), only those of the given shard are returned.
+# shard:	Tuple (index, count): Only return every count-th experiment starting with the index-th
+#			(None = return all experiments)
+def expand_spec(spec, shard = None):
+	matrix = spec.get("matrix", {})
+	axes = [[value if type(value) == dict else {axis : value} for value in matrix[axis]] for axis in matrix]
+	template = spec.get("exp_name", "_".join(["{%s}" % list(axis[0])[0] for axis in axes if len(axis) > 0]))
+	exp_names = set()
+	for combination in itertools.product(*axes):
+		record = dict(spec.get("defaults", {}))
+		for values in combination:
+			record.update(values)
+		if any([matches(record, partial) for partial in spec.get("exclude", [])]):
+			continue
+		for override in spec.get("override", []):
+			if matches(record, override["match"]):
+				record.update(override["set"])
+		# Derived parameters
+		record.setdefault("topology_generator", "generate_" + str(record.get("topology")))
+		if "rows" in record and "cols" in record:
+			record.setdefault("tiles", int(record["rows"]) * int(record["cols"]))
+		for param in integer_parameters:
+			if param in record:
+				record[param] = int(record[param])
+		record.setdefault("exp_name", template.format(**record))
+		record.setdefault("chip_name", record["exp_name"])
+		# Validation
+		missing = [param for param in parameters if param not in record]
+		if len(missing) > 0:
+			msg = "Experiment \"%s\" of the specification lacks the parameters: %s"
+			msg %= (record["exp_name"], ", ".join(missing))
+			error(__file__, msg)
+		if record["exp_name"] in exp_names:
+			msg = "Experiment name \"%s\" is used twice, the experiment names need to be unique"
+			msg %= record["exp_name"]
+			error(__file__, msg)
+		exp_names.add(record["exp_name"])
+		if shard == None or (len(exp_names) - 1) % shard[1] == shard[0]:
+			yield record
+
+# Run all experiments of a specification (or of one of its shards), returns the name of the output
+# file_name:	JSON or TOML file with the specification (see spec_sections)
+# shard:		Tuple (index, count) to only run a part of the experiments (see expand_spec), each
+#				shard is stored as a separate output
+def run_spec(file_name, shard = None):
+	spec = load_spec(file_name)
+	output_name = get_output_name(spec, shard)
+	run_experiment(expand_spec(spec, shard), output_name, **spec.get("settings", {}))
+	return output_name
+
+### Main ###
+if __name__ == "__main__":
+	args = sys.argv
+	if len(args) < 2:
+		print("Usage: python experiment_spec.py <spec-file> [<shard-index> <#shards>]")
+		sys.exit()
+	run_spec(args[1], (int(args[2]), int(args[3])) if len(args) > 3 else None)
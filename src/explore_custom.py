@@ -0,0 +1,155 @@
+# Libraries
+import sys
+import csv
+import math
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+# Custom files
+from technology import Technology
+from protocol import Protocol
+from unit_cell import UnitCell
+from estimate_performance import estimate_router_graph, get_pareto_candidates
+from run_experiment import run_experiment
+import generate_custom
+import results_db
+import config as cfg
+
+# Enumerate the configurations of the custom topology (sparse hamming graph, see generate_custom.py):
+# Each configuration is a pair of subsets of the row hops (2 ... cols-1) and column hops (2 ... rows-1)
+# that are added to the mesh.
+# max_hops:	Maximum number of row hops and of column hops per configuration (None = no limit)
+def enumerate_configs(rows, cols, max_hops = 2):
+	def subsets(hops):
+		limit = len(hops) if max_hops == None else min(max_hops, len(hops))
+		return [list(subset) for size in range(limit + 1) for subset in itertools.combinations(hops, size)]
+	return [[row_hops, col_hops] for row_hops in subsets(range(2, cols)) for col_hops in subsets(range(2, rows))]
+
+# Name of a configuration, e.g. "r2-4_c3" for row hops [2,4] and column hops [3]
+def get_config_name(config):
+	return "r" + "-".join([str(hop) for hop in config[0]]) + "_c" + "-".join([str(hop) for hop in config[1]])
+
+# Estimate the area, latency and throughput of a configuration without placing and routing it:
+# The tile size follows from the logic and router area (as in embed_tile_in_grid.py), the row hops
+# are routed in a horizontal channel above each row of tiles and the column hops in a vertical channel
+# next to each column of tiles. Each channel needs one unit cell per connection that crosses it at the
+# most crowded point. Latency and throughput are estimated from the resulting grid of routers.
+def estimate_config(tile_area, n_endpoints, tech_name, prot_name, bw, freq, rows, cols, config):
+	(row_hops, col_hops) = config
+	tech = Technology(tech_name)
+	prot = Protocol(prot_name)
+	ucell = UnitCell(tech_name, prot_name, bw, freq)
+	# Tile with a router that has one master and one slave port per mesh direction and per hop link
+	n_ports = 4 + 2 * len(row_hops) + 2 * len(col_hops)
+	router_area_in_ge = prot.router_area_in_ge(prot.mux_area_in_ge, prot.demux_area_in_ge, n_endpoints + n_ports, n_endpoints + n_ports, bw)
+	tile_size_in_mm = math.sqrt((tile_area + router_area_in_ge) * tech.mm2_per_ge)
+	# Channel sizes: A hop of length h has min(h, n - h) links (in each direction) crossing its most crowded point
+	row_channel_in_mm = ucell.height_in_mm * sum([2 * min(hop, cols - hop) for hop in row_hops])
+	col_channel_in_mm = ucell.width_in_mm * sum([2 * min(hop, rows - hop) for hop in col_hops])
+	(row_pitch_in_mm, col_pitch_in_mm) = (tile_size_in_mm + row_channel_in_mm, tile_size_in_mm + col_channel_in_mm)
+	area = rows * row_pitch_in_mm * cols * col_pitch_in_mm
+	# Grid of routers with the mesh and the additional hops (the delay grows with the distance)
+	channels = {}
+	def add_link(a, b, distance_in_mm):
+		delay = max(1, int(round(tech.s_per_mm * distance_in_mm * freq)))
+		channels[(a, b)] = delay
+		channels[(b, a)] = delay
+	for row in range(rows):
+		for hop in [1] + row_hops:
+			for col in range(cols - hop):
+				add_link(row * cols + col, row * cols + col + hop, hop * col_pitch_in_mm)
+	for col in range(cols):
+		for hop in [1] + col_hops:
+			for row in range(rows - hop):
+				add_link(row * cols + col, (row + hop) * cols + col, hop * row_pitch_in_mm)
+	estimate = estimate_router_graph(channels, [n_endpoints] * (rows * cols))
+	return {"area" : area, "latency" : estimate["latency"], "throughput" : estimate["throughput"]}
+
+# Explore the design space of the custom topology for one set of architectural parameters:
+# 1) Enumerate all configurations (see enumerate_configs)
+# 2) Estimate their area, latency and throughput analytically (see estimate_config) and keep the
+#	 configurations that are within the relative margin of the Pareto front of the estimates
+# 3) Generate and simulate the remaining configurations (see run_experiment, results are stored under
+#	 the given name and a configuration keeps its results as long as its inputs do not change)
+# 4) Report the configurations on the Pareto front of the simulated area, latency and throughput
+# The estimates of all configurations are written to <name>_candidates.csv and the Pareto set to
+# <name>_pareto.csv, the Pareto set is also returned.
+# max_hops:			Maximum number of row hops and of column hops per configuration
+# margin:			Relative distance from the estimated Pareto front within which configurations are simulated
+# max_candidates:	Maximum number of configurations to simulate, those with the smallest estimated area
+#					are preferred (None = no limit)
+# n_workers:		Number of processes used to estimate the configurations and concurrent BookSim
+#					simulations per configuration (None = number of CPU cores)
+# n_pnr, n_sim, n_seeds, search: See run_experiment
+def explore(name, tile_area, n_endpoints, tech, prot, bw, freq, rows, cols, traffic = "uniform", routing = "min", max_hops = 2, margin = 0.0, max_candidates = None, n_workers = None, n_pnr = None, n_sim = 1, n_seeds = 1, search = False):
+	# Enumerate and estimate all configurations
+	configs = enumerate_configs(rows, cols, max_hops)
+	print("Estimating %d configurations of the custom topology..." % len(configs))
+	with ProcessPoolExecutor(max_workers = n_workers) as pool:
+		args = [(tile_area, n_endpoints, tech, prot, bw, freq, rows, cols, config) for config in configs]
+		estimates = list(pool.map(estimate_config, *zip(*args)))
+
+	# Prune configurations that are far from the estimated Pareto front
+	selected = get_pareto_candidates([(est["area"], est["latency"], 1 / est["throughput"]) for est in estimates], margin)
+	if max_candidates != None:
+		selected = sorted(sorted(selected, key = lambda idx : estimates[idx]["area"])[:max_candidates])
+	print("Selected %d of %d configurations for simulation" % (len(selected), len(configs)))
+	with open(cfg.eval_results + name + "_candidates.csv", "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(["topology_config", "estimated_area", "estimated_latency", "estimated_throughput", "selected"])
+		for (idx, config) in enumerate(configs):
+			writer.writerow([str(config), estimates[idx]["area"], estimates[idx]["latency"], estimates[idx]["throughput"], idx in selected])
+
+	# Generate and simulate the selected configurations
+	experiments = []
+	for idx in selected:
+		exp_name = name + "_custom_" + get_config_name(configs[idx])
+		exp = {}
+		exp["exp_name"] = exp_name
+		exp["chip_name"] = exp_name
+		exp["param_name"] = name
+		exp["topology"] = "custom"
+		exp["topology_generator"] = generate_custom
+		exp["topology_config"] = configs[idx]
+		exp["tiles"] = rows * cols
+		exp["tile_area"] = int(tile_area)
+		exp["rows"] = rows
+		exp["cols"] = cols
+		exp["endpoints"] = n_endpoints
+		exp["technology"] = tech
+		exp["protocol"] = prot
+		exp["bandwidth"] = bw
+		exp["frequency"] = int(freq)
+		exp["traffic"] = traffic
+		exp["routing"] = routing
+		experiments.append(exp)
+	run_experiment(experiments, name, n_workers = n_workers, search = search, n_seeds = n_seeds, n_pnr = n_pnr, n_sim = n_sim)
+
+	# Pareto front of the simulated configurations (small area and latency, high throughput)
+	columns = ["exp_name", "topology_config", "total_area", "latency", "throughput", "estimated_latency", "estimated_throughput"]
+	rows_sim = [results_db.get_experiment(name, exp["exp_name"], columns)[0] for exp in experiments]
+	rows_sim = [row for row in rows_sim if row["latency"] != None and row["throughput"] != None]
+	pareto = [rows_sim[idx] for idx in get_pareto_candidates([(row["total_area"], row["latency"], -row["throughput"]) for row in rows_sim])]
+	pareto.sort(key = lambda row : row["total_area"])
+	with open(cfg.eval_results + name + "_pareto.csv", "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(columns)
+		for row in pareto:
+			writer.writerow([row[col] for col in columns])
+	print("Pareto set of the custom topology (%d of %d simulated configurations):" % (len(pareto), len(rows_sim)))
+	print("%-20s %15s %15s %15s" % ("Configuration", "Area [mm^2]", "Latency [cyc]", "Throughput"))
+	for row in pareto:
+		print("%-20s %15.2f %15.2f %15.2f" % (row["topology_config"], row["total_area"], row["latency"], row["throughput"]))
+	return pareto
+
+### Main ###
+if __name__ == "__main__":
+	args = sys.argv
+	if len(args) < 10:
+		print("Usage: python explore_custom.py <name> <tile-area> <#endpoints> <tech-name> <prot-name> <bw> <freq> <rows> <cols>"+\
+			  " [max-hops] [margin] [max-candidates]")
+		sys.exit()
+	explore(args[1], int(float(args[2])), int(args[3]), args[4], args[5], int(args[6]), int(float(args[7])), int(args[8]), int(args[9]),
+			max_hops = int(args[10]) if len(args) > 10 else 2,
+			margin = float(args[11]) if len(args) > 11 else 0.0,
+			max_candidates = int(args[12]) if len(args) > 12 else None)
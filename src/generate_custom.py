@@ -13,7 +13,7 @@ def generate(module_name, area, n_endpoints, tech, prot, bw, freq, rows, cols, c
 	# VALIDATION: config format
 	if len(config) < 2:
 		msg = "Config format: [<row-hops>,<col-hops>]"
-		error(__file__, msg)
+		error(__file__, msg, params = {"config" : config})
 	
 	# Get config
 	(row_hops, col_hops) = config
@@ -32,7 +32,7 @@ def generate(module_name, area, n_endpoints, tech, prot, bw, freq, rows, cols, c
 	# VALIDATION: Hypercube specific input validation
 	if math.log2(rows) % 1 != 0 or math.log2(cols) % 1 != 0:
 		msg = "rows and columns must both be powers of 2"
-		error(__file__, msg)
+		error(__file__, msg, params = {"rows" : rows, "cols" : cols})
 
 	# Compute size of bit-vectors that represent tile IDs.
 	row_dimensions = int(math.log2(rows))
@@ -13,7 +13,7 @@ def generate(module_name, area, n_endpoints, tech, prot, bw, freq, rows, cols, c
 	# VALIDATION: Format of config
 	if len(config) < 1:
 		msg = "Config format: [<bidirectional>]" 
-		error(__file__, msg)
+		error(__file__, msg, params = {"config" : config})
 	bidir = config[0]
 
 	# Create Tile
@@ -85,14 +85,14 @@ def generate(module_name, area, n_endpoints, tech, prot, bw, freq, rows, cols, c
 	# It ignore the explicit row and col parameters
 	if len(config) < 3:
 		msg = "Config format: [<q>,<rows>,<cols>]"
-		error(__file__, msg)
+		error(__file__, msg, params = {"config" : config})
 	(q,rows,cols) = config
 
 	# VALIDATION: check that the passed config parameter q is valid and supported
 	if q not in prime_powers and (q not in add or q not in mul):
 		msg = "Currently, q = %d is not supported"
 		msg %= q
-		error(__file__, msg)
+		error(__file__, msg, params = {"config" : config})
 
 	# Create Tile...
 	tile_name = module_name
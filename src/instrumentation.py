@@ -0,0 +1,65 @@
+# Libraries
+import resource
+import threading
+import time
+
+# Resources used by the BookSim processes started by this process (see record_booksim)
+booksim_usage = {"invocations" : 0, "peak_rss_in_mb" : 0}
+booksim_lock = threading.Lock()
+
+# Record the resource usage of a BookSim process once it terminated
+# rusage:	Resource usage as returned by os.wait4
+def record_booksim(rusage):
+	with booksim_lock:
+		booksim_usage["invocations"] += 1
+		booksim_usage["peak_rss_in_mb"] = max(booksim_usage["peak_rss_in_mb"], rusage.ru_maxrss / 1024)
+
+# Peak resident memory of this process in MB since the last reset (0 if it can not be determined)
+def get_peak_rss_in_mb():
+	try:
+		with open("/proc/self/status", "r") as status_file:
+			for line in status_file:
+				if line.startswith("VmHWM:"):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# Reset the peak resident memory of this process (only possible on Linux)
+def reset_peak_rss():
+	try:
+		with open("/proc/self/clear_refs", "w") as clear_file:
+			clear_file.write("5")
+	except OSError:
+		pass
+
+# CPU time of this process and all of its terminated child processes in seconds
+def get_cpu_time_in_s():
+	(own, children) = (resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN))
+	return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+# Run a function and measure the resources it used. Returns its result and the resource usage:
+# wall_time_in_s:		Wall-clock time
+# cpu_time_in_s:		CPU time of this process and of all child processes (such as BookSim)
+# peak_rss_in_mb:		Peak resident memory of this process or of one of the BookSim processes
+# booksim_invocations:	Number of BookSim processes that were started (cached simulations do not count)
+# Functions that run at the same time in the same process share their measurements.
+def measure(function, *args):
+	reset_peak_rss()
+	with booksim_lock:
+		booksim_usage["peak_rss_in_mb"] = 0
+		invocations = booksim_usage["invocations"]
+	(start, start_cpu) = (time.time(), get_cpu_time_in_s())
+	result = function(*args)
+	usage = {"wall_time_in_s" : time.time() - start, "cpu_time_in_s" : get_cpu_time_in_s() - start_cpu}
+	with booksim_lock:
+		usage["peak_rss_in_mb"] = max(get_peak_rss_in_mb(), booksim_usage["peak_rss_in_mb"])
+		usage["booksim_invocations"] = booksim_usage["invocations"] - invocations
+	return (result, usage)
+
+# Resource usage of two measurements that ran one after another
+def add_usage(first, second):
+	usage = {"wall_time_in_s" : first["wall_time_in_s"] + second["wall_time_in_s"], "cpu_time_in_s" : first["cpu_time_in_s"] + second["cpu_time_in_s"]}
+	usage["peak_rss_in_mb"] = max(first["peak_rss_in_mb"], second["peak_rss_in_mb"])
+	usage["booksim_invocations"] = first["booksim_invocations"] + second["booksim_invocations"]
+	return usage
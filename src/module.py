@@ -207,6 +207,14 @@ class Module:
 						 for i in range(len(con) -1)])
 			self.edge_delays[edge] = delay
 
+	# Change the clock frequency of this module and all of its components: Only the edge delays of the
+	# logical model depend on it (the grid, area and power do not), hence the routed module is kept
+	def set_frequency(self, frequency):
+		for comp in self.components:
+			comp["object"].set_frequency(frequency)
+		self.frequency = frequency
+		self.compose_graph(UnitCell(self.technology, self.protocol, self.bandwidth, self.frequency))
+
 	# Mirror this module
 	def mirror(self, xmirror, ymirror):
 		# Mirror grid
@@ -1,4 +1,5 @@
 # Libraries
+import numpy as np
 import xml.etree.ElementTree as ET
 from xml.dom import minidom
 
@@ -10,58 +11,126 @@ import config as cfg
 
 # Settings
 debug = False
+use_symmetry = False		# Default of the symmetric mode of place_and_route
+negotiation_iterations = 0	# Default of the maximum number of rip-up and reroute iterations of place_and_route
+max_negotiation_penalty = 2**16	# Upper bound of the factor with which negotiate_congestion weights the present usage
+max_representatives = 8		# Maximum number of routes per class of connections that the symmetric mode reuses
 
-# Print the intermediate grid (global routing)
+# Kinds of cells in the routing grids (the usage of wires is counted separately)
+cell_free = 0
+cell_tile = 1
+cell_master = 2
+cell_slave = 3
+
+# A routing grid consists of an array with the kind of each cell and an array with the number of
+# horizontal (usage[0]) and vertical (usage[1]) wires that pass through each cell.
+def create_grid(n_rows, n_cols):
+	kind = np.full((n_rows, n_cols), cell_free, dtype = np.int8)
+	usage = np.zeros((2, n_rows, n_cols), dtype = np.int32)
+	return (kind, usage)
+
+# Slice with the cells that range(start, end, step) visits (step is 1 or -1)
+def get_slice(start, end, step):
+	if step == 1:
+		return slice(start, max(start, end))
+	return slice(end + 1, max(end + 1, start + 1))
+
+# Cumulative wire counts of the fine grid: cums[0][row][col] is the number of horizontal wires in the cells
+# (row, 0 ... col-1) and cums[1][col][row] the number of vertical wires in the cells (0 ... row-1, col).
+# The wires in any straight span of cells are counted in constant time, adding a wire to a span takes
+# one vectorized update of the row or column (routes are added far less often than spans are counted).
+def create_cumulative_usage(n_rows, n_cols):
+	return (np.zeros((n_rows, n_cols + 1), dtype = np.int32), np.zeros((n_cols, n_rows + 1), dtype = np.int32))
+
+# Number of wires in the cells of a line (row or column of the cumulative usage) that range(start, end, step) visits
+def get_span_sum(cum_line, start, end, step):
+	span = get_slice(start, end, step)
+	return int(cum_line[span.stop] - cum_line[span.start])
+
+# Add a wire (or the given weight) to the cells of a line (row or column of the cumulative usage) that
+# range(start, end, step) visits
+def add_span(cum_line, start, end, step, weight = 1):
+	span = get_slice(start, end, step)
+	cum_line[span.start + 1 : span.stop + 1] += weight * np.arange(1, span.stop - span.start + 1)
+	cum_line[span.stop + 1:] += weight * (span.stop - span.start)
+
+# Cumulative sums along the lines of per-cell values (in the layout of create_cumulative_usage)
+def get_cumulative(values):
+	return np.concatenate((np.zeros((values.shape[0], 1), dtype = values.dtype), np.cumsum(values, axis = 1)), axis = 1)
+
+# Number of collisions in the fine grid: Wires in excess of one per cell and direction
+def count_collisions(cums):
+	return int(sum([np.maximum(np.diff(cum, axis = 1) - 1, 0).sum() for cum in cums]))
+
+# Rebuild a route from the candidate corners of the segments (see route_in_fine_grid): Returns the
+# corners from the master port to the k-th candidate corner of the last segment
+def get_route(corners_meta, k):
+	route = []
+	for (corners, collisions, lengths, back) in reversed(corners_meta):
+		route.append(corners[k])
+		k = back[k]
+	return route[::-1]
+
+# Straight spans of the cells that a fine route occupies as (type, row or column, start, end, direction),
+# the cells of the master and slave port are not part of the route
+def get_route_spans(route):
+	spans = []
+	for i in range(len(route)-1):
+		seg = (route[i], route[i+1])
+		seg_typ = "H" if seg[0][0] == seg[1][0] else "V"
+		seg_dir = 1 if ((seg_typ == "H" and seg[0][1] < seg[1][1]) or (seg_typ == "V" and seg[0][0] < seg[1][0])) else -1
+		fix = seg[0][0] if seg_typ == "H" else seg[0][1]
+		start = seg[0][1] if seg_typ == "H" else seg[0][0]
+		start = start if i > 0 else start + seg_dir
+		end = seg[1][1] if seg_typ == "H" else seg[1][0]
+		end = end if i < len(route) - 2 else end - seg_dir
+		spans.append((seg_typ, fix, start, end + seg_dir, seg_dir))
+	return spans
+
+# Class of a coarse connection under translation of tiles: The connection relative to the tile of its master port
+def get_translation_class(con):
+	return tuple([(point[0] - con[0][0], point[1] - con[0][1]) + tuple(point[2:]) for point in con])
+
+# Fine offset by which a route through the coarse rows (columns) first ... last moves if it is translated
+# by shift coarse rows (columns), None if the translated rows (columns) have different sizes
+def get_fine_offset(starts, sizes, first, last, shift):
+	offsets = set()
+	for idx in range(first, last + 1):
+		offsets.add(starts[idx + shift] - starts[idx])
+		offsets.add(starts[idx + shift] + sizes[idx + shift] - starts[idx] - sizes[idx])
+	return offsets.pop() if len(offsets) == 1 else None
+
+# Print a routing grid
 # This function is only used for debugging
-def print_intermediate_grid(grid):
-	n_rows = len(grid)
-	n_cols = len(grid[0])
+def print_grid(kind, usage, symbols):
+	(n_rows, n_cols) = kind.shape
 	for row in range(n_rows-1,-1,-1):
 		print(str(row) + (" " if row < 10 else "") + ": ", end = '')
 		for col in range(n_cols):
-			if grid[row][col] == "T":
+			if kind[row][col] == cell_tile:
 				print(" T ",end = '')
-			elif grid[row][col] == "M":
+			elif kind[row][col] == cell_master:
 				print(" M ",end = '')
-			elif grid[row][col] == "S":
+			elif kind[row][col] == cell_slave:
 				print(" S ",end = '')
-			elif type(grid[row][col]) == list:
-				print(" %d%d" % (tuple(grid[row][col])),end = '')
+			else:
+				print(symbols(usage[0][row][col], usage[1][row][col]),end = '')
 		print()
 	print("    ", end = '')
 	for col in range(n_cols):
 		print(" " + str(col) + (" " if col < 10 else ""), end = '')
 	print()
 
+# Print the intermediate grid (global routing)
+# This function is only used for debugging
+def print_intermediate_grid(kind, usage):
+	print_grid(kind, usage, lambda h, v : " %d%d" % (h, v))
+
 # Print the fine grid (detailed routing)
 # This function is only used for debugging
-def print_fine_grid(grid):
-	n_rows = len(grid)
-	n_cols = len(grid[0])
-	for row in range(n_rows-1,-1,-1):
-		print(str(row) + (" " if row < 10 else "") + ": ", end = '')
-		for col in range(n_cols):
-			if grid[row][col] == "T":
-				print(" T ",end = '')
-			elif grid[row][col] == "M":
-				print(" M ",end = '')
-			elif grid[row][col] == "S":
-				print(" S ",end = '')
-			elif grid[row][col] == [0,1]:
-				print(" | ",end = '')
-			elif grid[row][col] == [1,0]:
-				print(" - ",end = '')
-			elif grid[row][col] == [1,1]:
-				print(" + ",end = '')
-			elif grid[row][col] == [0,0]:
-				print("   ",end = '')
-			else:
-				print(" X ",end = '')
-		print()
-	print("    ", end = '')
-	for col in range(n_cols):
-		print(" " + str(col) + (" " if col < 10 else ""), end = '')
-	print()
+def print_fine_grid(kind, usage):
+	symbols = {(0,1) : " | ", (1,0) : " - ", (1,1) : " + ", (0,0) : "   "}
+	print_grid(kind, usage, lambda h, v : symbols.get((h, v), " X "))
 
 # Get the tile-face on which a port sits 
 def get_port_face(tile, typ, pid):
@@ -172,15 +241,13 @@ def compute_final_grid_size(cons_coarse, tile, rows_of_tiles, cols_of_tiles):
 	row_map = {row : (row // 2) * (tile.n_rows + 1) + (1 if row % 2 == 1 else 0) for row in range(2 * rows_of_tiles + 2)}
 	col_map = {col : (col // 2) * (tile.n_cols + 1) + (1 if col % 2 == 1 else 0) for col in range(2 * cols_of_tiles + 2)}
 
-	# Create intermediate grid
-	grid = [[[0,0] for col in range(n_cols)] for row in range(n_rows)]
-	for rot in range(1,2*rows_of_tiles+1,2):
-		for cot in range(1,2*cols_of_tiles+1,2):
-			for r in range(tile.n_rows):
-				for c in range(tile.n_cols):
-					grid[row_map[rot]+r][col_map[cot]+c] = "T"
+	# Create intermediate grid (every row and column that is not a multiple of the tile size + 1 holds tiles)
+	(grid, usage) = create_grid(n_rows, n_cols)
+	grid[np.outer(np.arange(n_rows) % (tile.n_rows + 1) != 0, np.arange(n_cols) % (tile.n_cols + 1) != 0)] = cell_tile
 
-	# Count the number of horizontal / vertical wires per cell in intermediate grid
+	# Collect the horizontal / vertical segments of all connections in the intermediate grid,
+	# each segment is stored as (row or column, first cell, last cell, direction)
+	segments = {"H" : [], "V" : []}
 	for con in cons_coarse:		
 		master_loc = (row_map[con[0][0]] + con[0][2], col_map[con[0][1]] + con[0][3])
 		slave_loc = (row_map[con[-1][0]] + con[-1][2], col_map[con[-1][1]] + con[-1][3])
@@ -217,8 +284,7 @@ def compute_final_grid_size(cons_coarse, tile, rows_of_tiles, cols_of_tiles):
 					row = slave_loc[0]
 					end_col = slave_loc[1] - seg_dir
 				# Count space needed for this segment
-				for col in range(start_col, end_col + seg_dir, seg_dir):
-					grid[row][col][0] += 1
+				segments["H"].append((row, start_col, end_col, seg_dir))
 				# Store where our connection ended
 				last_point = (row, end_col)
 			# VERTICAL
@@ -240,24 +306,227 @@ def compute_final_grid_size(cons_coarse, tile, rows_of_tiles, cols_of_tiles):
 					col = slave_loc[1]
 					end_row = slave_loc[0] - seg_dir
 				# Count space needed for this segment
-				for row in range(start_row, end_row + seg_dir, seg_dir):
-					grid[row][col][1] += 1
+				segments["V"].append((col, start_row, end_row, seg_dir))
 				# Store where our connection ended
 				last_point = (end_row, col)
 			else:
 				msg = "Connection (coarse) changes row and column in same hop"
 				error(__file__, msg)
 
-	print_intermediate_grid(grid) if debug else 0
+	# Count the number of horizontal / vertical wires per cell in intermediate grid: Each segment adds one
+	# at its first cell and removes it after its last cell, a cumulative sum along the lines yields the counts
+	for (idx, seg_typ, n_lines, n_cells) in [(0, "H", n_rows, n_cols), (1, "V", n_cols, n_rows)]:
+		(line, first, last, seg_dir) = np.array(segments[seg_typ], dtype = np.int64).reshape(-1, 4).T
+		(low, high) = (np.where(seg_dir == 1, first, last), np.where(seg_dir == 1, last, first))
+		(line, low, high) = (line[low <= high], low[low <= high], high[low <= high])
+		counts = np.zeros((n_lines, n_cells + 1), dtype = np.int32)
+		np.add.at(counts, (line, low), 1)
+		np.add.at(counts, (line, high + 1), -1)
+		counts = np.cumsum(counts[:, :-1], axis = 1)
+		usage[idx] = counts if seg_typ == "H" else counts.T
+
+	print_intermediate_grid(grid, usage) if debug else 0
 
 	# Compute required row- and columns size	
-	row_sizes = {row : (tile.n_rows if row % 2 == 1 else max([grid[row_map[row]][col][0] for col in range(0, n_cols)])) for row in range(2*rows_of_tiles+1)}
-	col_sizes = {col : (tile.n_cols if col % 2 == 1 else max([grid[row][col_map[col]][1] for row in range(0, n_rows)])) for col in range(2*cols_of_tiles+1)}		
+	row_sizes = {row : (tile.n_rows if row % 2 == 1 else int(usage[0][row_map[row]].max())) for row in range(2*rows_of_tiles+1)}
+	col_sizes = {col : (tile.n_cols if col % 2 == 1 else int(usage[1][:, col_map[col]].max())) for col in range(2*cols_of_tiles+1)}		
 
 	return (row_sizes, col_sizes)
 
+# Search the route of a coarse connection in the fine grid with the fewest collisions (and the shortest length
+# among those), collisions are counted with the cumulative usage cums (see create_cumulative_usage).
+# Returns the route and its collisions and length.
+def search_route(con, cums, row_starts, col_starts, row_sizes, col_sizes):
+	# Extract master and slave port location
+	master = (row_starts[con[0][0]] + con[0][2], col_starts[con[0][1]] + con[0][3])
+	slave = (row_starts[con[-1][0]] + con[-1][2], col_starts[con[-1][1]] + con[-1][3])
+	print("Master: %s" % str(master)) if debug else 0
+	print("Slave: %s" % str(slave)) if debug else 0
+	# Candidate corners of each segment as (corners, collisions, lengths, back-pointers): The route to a
+	# corner continues the route to the corner of the previous segment that its back-pointer indexes
+	corners_meta = []
+	# Insert master port
+	corners_meta.append(([master], np.zeros(1, dtype = np.int64), np.zeros(1, dtype = np.int64), np.full(1, -1)))
+	# Process segments
+	for i in range(len(con)-2):
+		# Gather segment info
+		seg = (con[i], con[i+1], con[i+2])
+		seg_typ = "H" if seg[0][0] == seg[1][0] else "V"
+		if seg_typ == "H":
+			seg_dir = 1 if seg[0][1] < seg[1][1] else -1
+			next_seg_dir = 1 if seg[1][0] < seg[2][0] else -1
+			corner_start = (col_starts[seg[1][1]]) if seg_dir == 1 else (col_starts[seg[1][1]] + col_sizes[seg[1][1]] - 1)
+			corner_end = (col_starts[seg[1][1]] + col_sizes[seg[1][1]]) if seg_dir == 1 else (col_starts[seg[1][1]] - 1)
+			turn_end = row_starts[seg[1][0]] + row_sizes[seg[1][0]] if next_seg_dir == 1 else row_starts[seg[1][0]] - 1
+		elif seg_typ == "V":
+			seg_dir = 1 if seg[0][0] < seg[1][0] else -1
+			next_seg_dir = 1 if seg[1][1] < seg[2][1] else -1
+			corner_start = (row_starts[seg[1][0]]) if seg_dir == 1 else (row_starts[seg[1][0]] + row_sizes[seg[1][0]] - 1)
+			corner_end = (row_starts[seg[1][0]] + row_sizes[seg[1][0]]) if seg_dir == 1 else (row_starts[seg[1][0]] - 1)
+			turn_end = col_starts[seg[1][1]] + col_sizes[seg[1][1]] if next_seg_dir == 1 else col_starts[seg[1][1]] - 1
+		print("Segment: %s, type: %s, direction: %s" % (seg[:2], seg_typ, seg_dir)) if debug else 0
+		# Wires along the segment (indexed by the fixed and the moving coordinate) and wires along
+		# the next segment (indexed by the corner location and the coordinate of the next segment)
+		(along, across) = (cums[0], cums[1]) if seg_typ == "H" else (cums[1], cums[0])
+		corner_locs = range(corner_start, corner_end, seg_dir)
+		(prev_corners, prev_collisions, prev_lengths, prev_back) = corners_meta[-1]
+		if len(corner_locs) == 0 or len(prev_corners) == 0:
+			corners_meta.append(([], np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64), np.zeros(0, dtype = np.int64)))
+			continue
+		# Collisions and length for each pair of previous corner (rows) and possible fine corner in
+		# the next coarse corner (columns), including the path to the (correct) border of the next corner
+		(fix, pos) = np.array(prev_corners, dtype = np.int64).T[::(1 if seg_typ == "H" else -1)]
+		locs = np.array(corner_locs, dtype = np.int64)
+		# Path from previous corner to first valid corner location
+		(access_start, access_end) = (pos + 1, np.maximum(pos + 1, corner_start)) if seg_dir == 1 else \
+									 (np.full(len(pos), corner_start + 1), np.maximum(corner_start + 1, pos))
+		collisions = (prev_collisions + along[fix, access_end] - along[fix, access_start])[:, None]
+		lengths = (prev_lengths + access_end - access_start)[:, None]
+		# Possible fine corners in next coarse corner
+		if seg_dir == 1:
+			collisions = collisions + along[fix[:, None], locs[None, :] + 1] - along[fix, corner_start][:, None]
+		else:
+			collisions = collisions + along[fix, corner_start + 1][:, None] - along[fix[:, None], locs[None, :]]
+		lengths = lengths + np.arange(1, len(corner_locs) + 1)[None, :]
+		# Route connections to (correct) border of next corner
+		(turn_start, turn_stop) = (fix, np.maximum(fix, turn_end)) if next_seg_dir == 1 else \
+								  (np.full(len(fix), turn_end + 1), np.maximum(turn_end + 1, fix + 1))
+		collisions += across[locs[None, :], turn_stop[:, None]] - across[locs[None, :], turn_start[:, None]]
+		lengths += (turn_stop - turn_start)[:, None]
+		# Quadratically reduce number of possible corners: For each fine corner, keep the previous
+		# corner with the fewest collisions and the shortest length (the first one if several are equal)
+		best = np.argmin(collisions * (lengths.max() + 1) + lengths, axis = 0)
+		fixes = fix[best].tolist()
+		corners = [(f, loc) if seg_typ == "H" else (loc, f) for (f, loc) in zip(fixes, corner_locs)]
+		k = np.arange(len(corner_locs))
+		corners_meta.append((corners, collisions[best, k], lengths[best, k], best))
+	# Only keep connections that can route to slave port
+	connections_valid = []	
+	last_seg_typ = "H" if con[-2][0] == con[-1][0] else "V"
+	(last_corners, last_collisions, last_lengths, last_back) = corners_meta[-1]
+	for (k, corner) in enumerate(last_corners):
+		# The corner needs to be in the row (column) of the slave port, the last stretch to the slave port
+		# is not part of the cost
+		if (last_seg_typ == "H" and corner[0] == slave[0]) or (last_seg_typ == "V" and corner[1] == slave[1]):
+			connections_valid.append((k, int(last_collisions[k]), int(last_lengths[k])))
+	# Out of remaining connections choose best one and rebuild its route from the back-pointers
+	chosen_con = None
+	chosen_collisions = float('inf')
+	chosen_length = float('inf')
+	for (k, c, l) in connections_valid:
+		if c < chosen_collisions or (c == chosen_collisions and l < chosen_length):
+			chosen_con = k
+			chosen_collisions = c
+			chosen_length = l
+	if chosen_con != None:
+		chosen_con = get_route(corners_meta, chosen_con) + [slave]
+	# If now fitting connection was found (e.g. happens if it is a straight connection in coarse grid but bot in fine grid)
+	if chosen_con == None:	
+		chosen_con = [master]
+		chosen_collisions = 0
+		chosen_length = 0
+
+		hdir = 1 if master[1] < slave[1] else -1
+		vdir = 1 if master[0] < slave[0] else -1
+		if con[0][0] == con[-1][0]:	
+			mid_col = (master[1] + slave[1]) // 2
+			# Segment 1
+			chosen_length += len(range(master[1]+hdir, mid_col+hdir, hdir))
+			chosen_collisions += get_span_sum(cums[0][master[0]], master[1]+hdir, mid_col+hdir, hdir)
+			chosen_con += [(master[0],mid_col)]
+			# Segment 2
+			chosen_length += len(range(master[0], slave[0]+vdir, vdir))
+			chosen_collisions += get_span_sum(cums[1][mid_col], master[0], slave[0]+vdir, vdir)
+			chosen_con += [(slave[0],mid_col)]
+			# Segment 3
+			chosen_length += len(range(mid_col, slave[1], vdir))
+			chosen_collisions += get_span_sum(cums[0][slave[0]], mid_col, slave[1], vdir)
+			chosen_con += [slave]
+		elif con[0][1] == con[-1][1]:	
+			mid_row = (master[0] + slave[0]) // 2
+			# Segment 1
+			chosen_length += len(range(master[0]+vdir, mid_row+vdir, vdir))
+			chosen_collisions += get_span_sum(cums[1][master[1]], master[0]+vdir, mid_row+vdir, vdir)
+			chosen_con += [(mid_row,master[1])]
+			# Segment 2
+			chosen_length += len(range(master[1], slave[1]+hdir, hdir))
+			chosen_collisions += get_span_sum(cums[0][mid_row], master[1], slave[1]+hdir, hdir)
+			chosen_con += [(mid_row,slave[1])]
+			# Segment 3
+			chosen_length += len(range(mid_row, slave[0], vdir))
+			chosen_collisions += get_span_sum(cums[1][slave[1]], mid_row, slave[0], vdir)
+			chosen_con += [slave]
+		else:
+			msg = "Unable to route connection %s"
+			msg %= str(con)
+			error(__file__, msg)
+	return (chosen_con, chosen_collisions, chosen_length)
+
+# Negotiated-congestion rip-up and reroute (PathFinder): In each iteration, all routes that share a cell with
+# another route are ripped up and searched again (in the order of the connections). The cost of a cell is its
+# present usage, weighted with a factor that doubles in each iteration (up to max_negotiation_penalty), plus
+# its history: The collisions it had at the start of each iteration. Stops after the given number of
+# iterations, once there are no collisions or once an iteration does not reduce the collisions and reports
+# the collisions of each iteration. Returns the routes of the iteration with the fewest collisions and their
+# cumulative usage.
+def negotiate_congestion(cons_coarse, cons_fine, cums, row_starts, col_starts, row_sizes, col_sizes, iterations):
+	cons_fine = list(cons_fine)
+	history = [np.zeros((cum.shape[0], cum.shape[1] - 1), dtype = np.int32) for cum in cums]
+	collisions = count_collisions(cums)
+	(best, best_collisions) = (list(cons_fine), collisions)
+	print("Negotiated congestion: %d collisions after greedy routing" % collisions)
+	penalty = 1
+	for iteration in range(1, iterations + 1):
+		if collisions == 0:
+			break
+		previous_collisions = collisions
+		# Collisions at the start of the iteration select the routes to reroute and add to the history
+		overuse_cums = []
+		for d in range(2):
+			overuse = np.maximum(np.diff(cums[d], axis = 1) - 1, 0)
+			history[d] += overuse
+			overuse_cums.append(get_cumulative(overuse))
+		colliding = [j for j in range(len(cons_coarse)) if sum([get_span_sum(overuse_cums[0 if typ == "H" else 1][fix], start, end, step) \
+					 for (typ, fix, start, end, step) in get_route_spans(cons_fine[j])]) > 0]
+		del overuse, overuse_cums
+		penalty = min(2 * penalty, max_negotiation_penalty)
+		# Cumulative cost (built in place, the fine grid of large chips has millions of cells)
+		costs = []
+		for d in range(2):
+			cost = cums[d].astype(np.int64)
+			cost *= penalty
+			cost[:, 1:] += np.cumsum(history[d], axis = 1, dtype = np.int64)
+			costs.append(cost)
+		for j in colliding:
+			# Rip up
+			for (typ, fix, start, end, step) in get_route_spans(cons_fine[j]):
+				add_span(cums[0 if typ == "H" else 1][fix], start, end, step, -1)
+				add_span(costs[0 if typ == "H" else 1][fix], start, end, step, -penalty)
+			# Reroute
+			cons_fine[j] = search_route(cons_coarse[j], costs, row_starts, col_starts, row_sizes, col_sizes)[0]
+			for (typ, fix, start, end, step) in get_route_spans(cons_fine[j]):
+				add_span(cums[0 if typ == "H" else 1][fix], start, end, step)
+				add_span(costs[0 if typ == "H" else 1][fix], start, end, step, penalty)
+		del costs
+		collisions = count_collisions(cums)
+		print("Negotiated congestion: %d collisions after iteration %d (%d routes rerouted)" % (collisions, iteration, len(colliding)))
+		if collisions < best_collisions:
+			(best, best_collisions) = (list(cons_fine), collisions)
+		if collisions >= previous_collisions:
+			break
+	# Restore the best iteration
+	if best_collisions < collisions:
+		cums = create_cumulative_usage(cums[0].shape[0], cums[1].shape[0])
+		for route in best:
+			for (typ, fix, start, end, step) in get_route_spans(route):
+				add_span(cums[0 if typ == "H" else 1][fix], start, end, step)
+	return (best, cums)
+
 # Perform detailed routing in fine grid
-def route_in_fine_grid(cons_coarse, tile, row_sizes, col_sizes):
+# symmetric:	Connections that are translations of each other (see get_translation_class) reuse the route of
+#				a previous one instead of searching for a route (if it fits without collisions)
+# iterations:	Maximum number of rip-up and reroute iterations after the greedy routing (see negotiate_congestion)
+def route_in_fine_grid(cons_coarse, tile, row_sizes, col_sizes, symmetric = False, iterations = 0):
 	# Gather info on rows and columns
 	n_rows = sum(row_sizes.values())
 	n_cols = sum(col_sizes.values())
@@ -277,201 +546,75 @@ def route_in_fine_grid(cons_coarse, tile, row_sizes, col_sizes):
 		col += col_sizes[col_idx]
 
 	# Construct grid 
-	grid = [[[0,0] for col in range(n_cols)] for row in range(n_rows)]
+	grid = create_grid(n_rows, n_cols)[0]
+	cums = create_cumulative_usage(n_rows, n_cols)
 	for row in row_starts:
 		for col in col_starts:
 			# Rows / cols with tiles
 			if row % 2 == 1 and col % 2 == 1:
-				for r in range(row_starts[row], row_starts[row+1], 1):
-					for c in range(col_starts[col], col_starts[col+1], 1):
-						grid[r][c] = "T"
+				grid[row_starts[row]:row_starts[row+1], col_starts[col]:col_starts[col+1]] = cell_tile
 				for master in tile.master_ports:	
 					mport = master["location"]
-					grid[row_starts[row] + mport[0]][col_starts[col] + mport[1]] = "M"
+					grid[row_starts[row] + mport[0]][col_starts[col] + mport[1]] = cell_master
 				for slave in tile.slave_ports:	
 					sport = slave["location"]
-					grid[row_starts[row] + sport[0]][col_starts[col] + sport[1]] = "S"
+					grid[row_starts[row] + sport[0]][col_starts[col] + sport[1]] = cell_slave
 
 	# Route connections with minimal conflicts / length
 	cons_fine = []
+	representatives = {}	# Routes per class of connections (symmetric mode)
+	fine_offsets = {}		# Fine offsets of translations (see get_fine_offset)
 	for con in cons_coarse:
 		print("Con-coarse: " + str(con)) if debug else 0
-		# Extract master and slave port location
-		master = (row_starts[con[0][0]] + con[0][2], col_starts[con[0][1]] + con[0][3])
-		slave = (row_starts[con[-1][0]] + con[-1][2], col_starts[con[-1][1]] + con[-1][3])
-		print("Master: %s" % str(master)) if debug else 0
-		print("Slave: %s" % str(slave)) if debug else 0
-		corners_meta = []
-		# Insert master port
-		# Corner, collisions, length, all previous corners
-		corners_meta.append([(master,0,0,[])])
-		# Process segments
-		for i in range(len(con)-2):
-			# Gather segment info
-			seg = (con[i], con[i+1], con[i+2])
-			seg_typ = "H" if seg[0][0] == seg[1][0] else "V"
-			if seg_typ == "H":
-				seg_dir = 1 if seg[0][1] < seg[1][1] else -1
-				next_seg_dir = 1 if seg[1][0] < seg[2][0] else -1
-				corner_start = (col_starts[seg[1][1]]) if seg_dir == 1 else (col_starts[seg[1][1]] + col_sizes[seg[1][1]] - 1)
-				corner_end = (col_starts[seg[1][1]] + col_sizes[seg[1][1]]) if seg_dir == 1 else (col_starts[seg[1][1]] - 1)
-			elif seg_typ == "V":
-				seg_dir = 1 if seg[0][0] < seg[1][0] else -1
-				next_seg_dir = 1 if seg[1][1] < seg[2][1] else -1
-				corner_start = (row_starts[seg[1][0]]) if seg_dir == 1 else (row_starts[seg[1][0]] + row_sizes[seg[1][0]] - 1)
-				corner_end = (row_starts[seg[1][0]] + row_sizes[seg[1][0]]) if seg_dir == 1 else (row_starts[seg[1][0]] - 1)
-			print("Segment: %s, type: %s, direction: %s" % (seg[:2], seg_typ, seg_dir)) if debug else 0
-			# Prepare data structure to store intermediate results
-			corners_interm = {}
-			# Iterate through previous corners
-			for (prev_corner, c, l, p) in corners_meta[-1]:
-				print("Checking from start point %s" % str(prev_corner)) if debug else 0
-				# Examine path from previous corner to first valid corner location
-				idx = 0 if seg_typ == "H" else 1
-				fix = prev_corner[idx]
-				length_tmp = 0
-				collisions_tmp = 0
-				# Path from previous corner to next corner
-				for loc in range(prev_corner[1-idx] + seg_dir, corner_start, seg_dir):
-					print("Checking Access: %s" % str((fix,loc) if seg_typ == "H" else (loc,fix))) if debug else 0
-					length_tmp += 1
-					collisions_tmp += (grid[fix][loc][idx] if seg_typ == "H" else grid[loc][fix][idx])
-				# Examine possible fine corners in next coarse corner
-				for loc in range(corner_start, corner_end, seg_dir):
-					print("Checking Corner: %s" % str((fix,loc) if seg_typ == "H" else (loc,fix))) if debug else 0
-					length_tmp += 1
-					collisions_tmp += (grid[fix][loc][idx] if seg_typ == "H" else grid[loc][fix][idx])
-					if seg_typ == "H":
-						print("Adding intermediate corner %s" % str((fix,loc))) if debug else 0
-						corners_interm[(fix,loc)] = (c + collisions_tmp, l + length_tmp, p + [prev_corner])
-					else:
-						print("Adding intermediate corner %s" % str((loc,fix))) if debug else 0
-						corners_interm[(loc,fix)] = (c + collisions_tmp, l + length_tmp, p + [prev_corner])
-			# Finalize: Route connections to (correct) border of next corner + quadratically reduce number of possible corners
-			corners_final = {}	
-			for corner in corners_interm:
-				# Gather info
-				(c,l,p) = corners_interm[corner]
-				if seg_typ == "H":
-					fix = corner[1]
-					start = corner[0]
-					end = row_starts[seg[1][0]] + row_sizes[seg[1][0]] if next_seg_dir == 1 else row_starts[seg[1][0]] - 1
-				else:
-					fix = corner[0]
-					start = corner[1]
-					end = col_starts[seg[1][1]] + col_sizes[seg[1][1]] if next_seg_dir == 1 else col_starts[seg[1][1]] - 1
-				# Compute collisions and length until border of coarse-corner cell
-				collisions_tmp = c
-				length_tmp = l
-				for loc in range(start, end, next_seg_dir):
-					length_tmp += 1
-					collisions_tmp += grid[loc][fix][1] if seg_typ == "H" else grid[fix][loc][0]
-				new_corner = (loc,fix) if seg_typ == "H" else (fix,loc)
-				# Store corner (if new or improvement)
-				if new_corner not in corners_final:
-					corners_final[new_corner] = (corner, collisions_tmp, length_tmp, p)
-				else:
-					(corner_, c_, l_, p_) = corners_final[new_corner]
-					if collisions_tmp < c_ or (collisions_tmp == c_ and length_tmp < l_):
-						corners_final[new_corner] = (corner, collisions_tmp, length_tmp, p)
-			corners_meta.append(corners_final.values())
-		# Only keep connections that can route to slave port
-		connections_valid = []	
-		last_seg_typ = "H" if con[-2][0] == con[-1][0] else "V"
-		last_seg_dir = 1 if ((last_seg_typ == "H" and con[-2][1] < con[-1][1]) or (last_seg_typ == "V" and con[-2][0] < con[-1][0])) else -1
-		idx = 0 if last_seg_typ == "H" else 1
-		for (corner, c, l, prev) in corners_meta[-1]:
-			if (last_seg_typ == "H" and corner[0] == slave[0]) or (last_seg_typ == "V" and corner[1] == slave[1]):
-				fix = corner[idx]
-				collisions_tmp = c
-				length_tmp = l
-				for loc in range (corner[idx], slave[idx], last_seg_dir):
-					length_tmp += 1
-					collisions_tmp += grid[fix][loc][idx] if last_seg_typ == "H" else grid[loc][fix][idx]
-				connections_valid.append((prev + [corner] + [slave], collisions_tmp, length_tmp))
-		# Out of remaining connections choose best one
-		chosen_con = None
-		chosen_collisions = float('inf')
-		chosen_length = float('inf')
-		for (con, c, l) in connections_valid:
-			if c < chosen_collisions or (c == chosen_collisions and l < chosen_length):
-				chosen_con = con
-				chosen_collisions = c
-				chosen_length = l
-		# If now fitting connection was found (e.g. happens if it is a straight connection in coarse grid but bot in fine grid)
-		if chosen_con == None:	
-			chosen_con = [master]
-			chosen_collisions = 0
-			chosen_length = 0
-
-			hdir = 1 if master[1] < slave[1] else -1
-			vdir = 1 if master[0] < slave[0] else -1
-			if con[0][0] == con[-1][0]:	
-				mid_col = (master[1] + slave[1]) // 2
-				# Segment 1
-				row = master[0]	
-				for col in range(master[1]+hdir, mid_col+hdir, hdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][0]
-				chosen_con += [(row,col)]
-				# Segment 2
-				col = mid_col
-				for row in range(master[0], slave[0]+vdir, vdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][1]
-				chosen_con += [(row,col)]
-				# Segment 3
-				row = slave[0]	
-				for col in range(mid_col, slave[1], vdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][0]
-				chosen_con += [slave]
-			elif con[0][1] == con[-1][1]:	
-				mid_row = (master[0] + slave[0]) // 2
-				# Segment 1
-				col = master[1]	
-				for row in range(master[0]+vdir, mid_row+vdir, vdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][1]
-				chosen_con += [(row,col)]
-				# Segment 2
-				row = mid_row
-				for col in range(master[1], slave[1]+hdir, hdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][0]
-				chosen_con += [(row,col)]
-				# Segment 3
-				col = slave[1]	
-				for row in range(mid_row, slave[0], vdir):
-					chosen_length += 1
-					chosen_collisions += grid[row][col][1]
-				chosen_con += [slave]
-			else:
-				msg = "Unable to route connection %s"
-				msg %= str(con)
-				error(__file__, msg)
+		# Symmetric mode: Reuse the route of a previous connection of the same class, translated to this
+		# connection, if the rows and columns on the way have the same sizes and the route has no collisions
+		translated = None
+		for (rep_con, rep_route) in (representatives.get(get_translation_class(con), []) if symmetric else []):
+			(rows, cols) = ([point[0] for point in rep_con], [point[1] for point in rep_con])
+			row_key = ("row", min(rows), max(rows), con[0][0] - rep_con[0][0])
+			col_key = ("col", min(cols), max(cols), con[0][1] - rep_con[0][1])
+			if row_key not in fine_offsets:
+				fine_offsets[row_key] = get_fine_offset(row_starts, row_sizes, *row_key[1:])
+			if col_key not in fine_offsets:
+				fine_offsets[col_key] = get_fine_offset(col_starts, col_sizes, *col_key[1:])
+			(row_offset, col_offset) = (fine_offsets[row_key], fine_offsets[col_key])
+			if row_offset != None and col_offset != None:
+				route = [(row + row_offset, col + col_offset) for (row, col) in rep_route]
+				spans = get_route_spans(route)
+				if sum([get_span_sum(cums[0 if typ == "H" else 1][fix], start, end, step) for (typ, fix, start, end, step) in spans]) == 0:
+					translated = route
+					break
+		if translated != None:
+			print("Translated route of %s" % str(rep_con)) if debug else 0
+			cons_fine.append(translated)
+			for (typ, fix, start, end, step) in spans:
+				add_span(cums[0 if typ == "H" else 1][fix], start, end, step)
+			continue
+		(chosen_con, chosen_collisions, chosen_length) = search_route(con, cums, row_starts, col_starts, row_sizes, col_sizes)
 		# Store chosen connection to list
 		cons_fine.append(chosen_con)	
 		print("Routed as %s with %d collisions and length %d" % (str(chosen_con), chosen_collisions, chosen_length)) if debug else 0
 		# Add chosen connection to grid
-		for i in range(len(chosen_con)-1):
-			seg = (chosen_con[i], chosen_con[i+1])
-			seg_typ = "H" if seg[0][0] == seg[1][0] else "V"
-			seg_dir = 1 if ((seg_typ == "H" and seg[0][1] < seg[1][1]) or (seg_typ == "V" and seg[0][0] < seg[1][0])) else -1
-			idx = 0 if seg_typ == "H" else 1
-			fix = seg[0][0] if seg_typ == "H" else seg[0][1]
-			start = seg[0][1] if seg_typ == "H" else seg[0][0]
-			start = start if i > 0 else start + seg_dir
-			end = seg[1][1] if seg_typ == "H" else seg[1][0]
-			end = end if i < len(chosen_con) - 2 else end - seg_dir
-			for loc in range(start, end + seg_dir, seg_dir):
-				(grid[fix][loc] if seg_typ == "H" else grid[loc][fix])[idx] += 1
-	print_fine_grid(grid) if debug else 0
+		for (typ, fix, start, end, step) in get_route_spans(chosen_con):
+			add_span(cums[0 if typ == "H" else 1][fix], start, end, step)
+		# Routes that were searched for become representatives of their class (a few per class, such that
+		# connections that share a channel with a translated route can use another lane)
+		if symmetric and len(representatives.setdefault(get_translation_class(con), [])) < max_representatives:
+			representatives[get_translation_class(con)].append((con, chosen_con))
+	# Rip up and reroute connections with collisions
+	if iterations > 0:
+		(cons_fine, cums) = negotiate_congestion(cons_coarse, cons_fine, cums, row_starts, col_starts, row_sizes, col_sizes, iterations)
+	print_fine_grid(grid, np.stack((np.diff(cums[0], axis = 1), np.diff(cums[1], axis = 1).T))) if debug else 0
 	return cons_fine
 
 
 # Perform place and route for a homogeneous chip with same-sized tiles arranged in rows and columns
-def place_and_route(module, tile, tech, prot, bw, freq, rows_of_tiles, cols_of_tiles, cons_raw):
+# symmetric:	Reuse the detailed routes of connections that are translations of each other, which makes the
+#				routing time grow with the number of distinct connections rather than with the number of tiles
+#				(None = use the setting above, see route_in_fine_grid)
+# iterations:	Maximum number of negotiated-congestion rip-up and reroute iterations after the greedy routing
+#				(None = use the setting above, see negotiate_congestion)
+def place_and_route(module, tile, tech, prot, bw, freq, rows_of_tiles, cols_of_tiles, cons_raw, symmetric = None, iterations = None):
 	print("Place and Route...")
 
 	# Input Validation	
@@ -490,7 +633,8 @@ def place_and_route(module, tile, tech, prot, bw, freq, rows_of_tiles, cols_of_t
 	n_cols = sum(col_sizes.values())
 
 	# Route connections in fine grid
-	cons_fine = route_in_fine_grid(cons_coarse, tile, row_sizes, col_sizes)
+	cons_fine = route_in_fine_grid(cons_coarse, tile, row_sizes, col_sizes, use_symmetry if symmetric == None else symmetric, \
+									negotiation_iterations if iterations == None else iterations)
 
 	# Compose XML file for new module
 	xml_root = ET.Element("module")
@@ -1,8 +1,8 @@
 # Libraries
 import matplotlib.pyplot as plt
-import pandas as pd
 
 # Custom files
+from results_db import load_experiments
 import config as cfg
 
 # configure label, color, marker and abbreviation for topologies
@@ -60,11 +60,18 @@ def get_lab_col_mar_abv(name):
 		col = col.replace("DD","88").replace("66","11")
 	return (lab, col, mar, abv)
 
+# Read the results of an experiment run without the experiments that failed
+def read_results(filename):
+	df = load_experiments(cfg.eval_results + filename)
+	if "status" in df:
+		df = df[df["status"] != "failed"]
+	return df
+
 # Create comparison plot with latency-vs-load plot, area-bars and power-bars
 def create_comparison_plot_v1(filename, plotname, topologies, param_name):
 
 	# Read data
-	df = pd.read_csv(cfg.eval_results + filename + ".csv");
+	df = read_results(filename)
 	df = df[(df["param_name"] == param_name) & (df["topology"].isin(topologies))]
 
 	# Set up figure
@@ -92,9 +99,9 @@ def create_comparison_plot_v1(filename, plotname, topologies, param_name):
 		data = df[(df["topology"] == topology)]
 		if len(data.index) > 0:
 			# create latency-vs-load plot
-			load_lat_pairs = eval(data["load_lat_pairs"].iat[0])
-			loads = [x[0] for x in load_lat_pairs]
-			lats = [x[1] for x in load_lat_pairs]
+			load_lat_pairs = data["load_lat_pairs"].iat[0]
+			loads = load_lat_pairs[:,0]
+			lats = load_lat_pairs[:,1]
 			ax[0].plot(loads, lats, label = lab, marker = mar, color = col, markersize = 3,\
 					fillstyle="none", linewidth = 1)
 			# Prepare bar plot (area)
@@ -126,11 +133,44 @@ def create_comparison_plot_v1(filename, plotname, topologies, param_name):
 	# Store plot
 	plt.savefig(cfg.plots + plotname + ".pdf")
 
+# Create plot with the accepted throughput over the offered load
+def create_throughput_plot(filename, plotname, topologies, param_name):
+
+	# Read data
+	df = read_results(filename)
+	df = df[(df["param_name"] == param_name) & (df["topology"].isin(topologies))]
+
+	# Set up figure
+	fig, ax = plt.subplots(1,1, figsize = (3,3))
+	plt.subplots_adjust(left=0.2, right = 0.95, top = 0.95, bottom = 0.15)
+	ax.grid()
+	ax.set_xlim(0,100)
+	ax.set_ylim(0,100)
+	ax.set_xlabel("Offered Load [%]")
+	ax.set_ylabel("Accepted Throughput [%]")
+
+	# Ideal network
+	ax.plot([0,100], [0,100], color = "#999999", linestyle = "--", linewidth = 1)
+
+	# Plot data
+	for topology in topologies:	
+		(lab, col, mar, abv) = get_lab_col_mar_abv(topology)
+		data = df[(df["topology"] == topology)]
+		# Skip if no data found
+		if len(data) == 0:
+			continue
+		load_acc_pairs = data["load_acc_pairs"].iat[0]
+		loads = 100 * load_acc_pairs[:,0]
+		accs = 100 * load_acc_pairs[:,1]
+		ax.plot(loads, accs, label = lab, marker = mar, color = col, markersize = 3, fillstyle = "none", linewidth = 1)
+	# Save plot
+	plt.savefig(cfg.plots + plotname + ".pdf")
+
 # Create comparison plots with one latency-vs-throughput and one power-vs-area plot
 def create_comparison_plot_v2(filename, plotname, topologies, param_name):
 
 	# Read data
-	df = pd.read_csv(cfg.eval_results + filename + ".csv");
+	df = read_results(filename)
 	df = df[(df["param_name"] == param_name) & (df["topology"].isin(topologies))]
 
 	# Set up figure
@@ -246,7 +286,7 @@ def create_additional_plot_for_slides(filename, plotname, topologies, param_name
 
 
 	# Read data
-	df = pd.read_csv(cfg.eval_results + filename + ".csv");
+	df = read_results(filename)
 	df = df[(df["param_name"] == param_name) & (df["topology"].isin(topologies))]
 
 	############### Figure 1: Area vs. Router Radix ##################
@@ -1,17 +1,25 @@
 # Libraries
+import os
 import xml.etree.ElementTree as ET
 
 # Custom files
 import config as cfg
 
+# Parsed protocol descriptions, indexed by path and modification time, such that long-running
+# processes (see experiment_service.py) parse each description only once
+parsed = {}
+
 class Protocol():
 
 	def __init__(self, prot_name):
-		xml_root = ET.parse(cfg.protocol_path + prot_name + ".xml").getroot()
-		self.wires_per_connection = eval(xml_root.find("wires_per_connection").text)
-		self.mux_area_in_ge = eval(xml_root.find("mux_area_in_ge").text)
-		self.demux_area_in_ge = eval(xml_root.find("demux_area_in_ge").text)
-		self.router_area_in_ge = eval(xml_root.find("router_area_in_ge").text)
-		self.phy_area_in_ge = eval(xml_root.find("phy_area_in_ge").text)
-
-
+		path = cfg.protocol_path + prot_name + ".xml"
+		key = (os.path.realpath(path), os.stat(path).st_mtime_ns)
+		if key not in parsed:
+			xml_root = ET.parse(path).getroot()
+			self.wires_per_connection = eval(xml_root.find("wires_per_connection").text)
+			self.mux_area_in_ge = eval(xml_root.find("mux_area_in_ge").text)
+			self.demux_area_in_ge = eval(xml_root.find("demux_area_in_ge").text)
+			self.router_area_in_ge = eval(xml_root.find("router_area_in_ge").text)
+			self.phy_area_in_ge = eval(xml_root.find("phy_area_in_ge").text)
+			parsed[key] = dict(self.__dict__)
+		self.__dict__.update(parsed[key])
@@ -0,0 +1,266 @@
+# Libraries
+import sqlite3
+import csv
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Parquet files are only written if pyarrow is available (otherwise NumPy archives are used)
+try:
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+except ImportError:
+	pa = None
+
+# Custom files
+from booksim_stats import csv_columns
+import config as cfg
+
+# Tables and indexes of the results database
+schema = [
+	# One row per simulated load and traffic class (statistics as in the BookSim results files)
+	"CREATE TABLE IF NOT EXISTS simulations (topology TEXT, traffic TEXT, routing TEXT, created REAL, log TEXT, " + \
+	", ".join(["\"%s\"" % col for col in csv_columns]) + ")",
+	"CREATE INDEX IF NOT EXISTS simulations_idx ON simulations (topology, traffic, routing)",
+	# One row per experiment, further columns (parameters and outputs) are added on demand
+	"CREATE TABLE IF NOT EXISTS experiments (output_name TEXT, position INTEGER, created REAL, exp_name TEXT, fingerprint TEXT)",
+	"CREATE INDEX IF NOT EXISTS experiments_idx ON experiments (output_name, position)",
+	# Resource usage per stage of each experiment (see instrumentation.measure)
+	"CREATE TABLE IF NOT EXISTS stage_timings (output_name TEXT, exp_name TEXT, stage TEXT, wall_time_in_s REAL, created REAL)",
+	"CREATE INDEX IF NOT EXISTS stage_timings_idx ON stage_timings (output_name, exp_name)",
+]
+
+# Resource usage columns of the stage_timings table
+usage_columns = ["wall_time_in_s", "cpu_time_in_s", "peak_rss_in_mb", "booksim_invocations"]
+
+# Columns of the experiments table that get an index once they exist
+indexed_experiment_columns = ["topology", "param_name", "traffic"]
+
+# Columns of the experiments table that hold curves (lists of (load, value) pairs stored as JSON)
+curve_columns = ["load_lat_pairs", "load_acc_pairs"]
+
+# Open the results database (changes are committed when used as context manager), databases of
+# earlier versions get the columns that identify experiments
+def connect():
+	con = sqlite3.connect(cfg.results_db, timeout = 60)
+	con.execute("PRAGMA journal_mode=WAL")
+	for statement in schema:
+		con.execute(statement)
+	with con:
+		add_columns(con, "experiments", ["exp_name", "fingerprint"])
+	return con
+
+# Add missing columns to a table
+def add_columns(con, table, columns):
+	existing = [row[1] for row in con.execute("PRAGMA table_info(%s)" % table)]
+	for col in columns:
+		if col not in existing:
+			con.execute("ALTER TABLE %s ADD COLUMN \"%s\"" % (table, col))
+			if table == "experiments" and col in indexed_experiment_columns:
+				con.execute("CREATE INDEX IF NOT EXISTS experiments_%s_idx ON experiments (\"%s\")" % (col, col))
+
+# Replace all simulation results of a topology, traffic pattern and routing function
+# results:	Statistics (BookSimStats) for each load
+def store_simulations(topo, traffic, routing, results):
+	con = connect()
+	with con:
+		add_columns(con, "simulations", csv_columns)
+		con.execute("DELETE FROM simulations WHERE topology = ? AND traffic = ? AND routing = ?", (topo, traffic, routing))
+		for load in sorted(results):
+			for row in results[load].to_csv_rows(load):
+				values = [topo, traffic, routing, time.time(), results[load].log] + row
+				columns = ["topology", "traffic", "routing", "created", "log"] + csv_columns
+				query = "INSERT INTO simulations (%s) VALUES (%s)" % (", ".join(["\"%s\"" % col for col in columns]), ", ".join(["?"] * len(values)))
+				con.execute(query, values)
+	con.close()
+
+# Export the simulation results of a topology, traffic pattern and routing function to a csv file
+def export_simulations(topo, traffic, routing, file_name):
+	con = connect()
+	add_columns(con, "simulations", csv_columns)
+	query = "SELECT %s FROM simulations WHERE topology = ? AND traffic = ? AND routing = ? ORDER BY load, class"
+	query %= ", ".join(["\"%s\"" % col for col in csv_columns])
+	rows = con.execute(query, (topo, traffic, routing)).fetchall()
+	con.close()
+	with open(file_name, "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(csv_columns)
+		writer.writerows(rows)
+
+# Remove all experiments that belong to an output
+def clear_experiments(output_name):
+	con = connect()
+	with con:
+		con.execute("DELETE FROM experiments WHERE output_name = ?", (output_name,))
+		con.execute("DELETE FROM stage_timings WHERE output_name = ?", (output_name,))
+	con.close()
+
+# Fingerprints of the experiments that are stored for an output (indexed by experiment name)
+def get_fingerprints(output_name):
+	con = connect()
+	rows = con.execute("SELECT exp_name, fingerprint FROM experiments WHERE output_name = ?", (output_name,)).fetchall()
+	con.close()
+	return {exp_name : fingerprint for (exp_name, fingerprint) in rows}
+
+# Remove all experiments of an output that are not listed with the same fingerprint and move the
+# remaining ones to their new position
+# experiments:	Position and fingerprint of each experiment (indexed by experiment name)
+def keep_experiments(output_name, experiments):
+	con = connect()
+	with con:
+		for (exp_name, fingerprint) in set(con.execute("SELECT exp_name, fingerprint FROM experiments WHERE output_name = ?", (output_name,)).fetchall()):
+			if exp_name in experiments and experiments[exp_name][1] == fingerprint:
+				con.execute("UPDATE experiments SET position = ? WHERE output_name = ? AND exp_name = ?", (experiments[exp_name][0], output_name, exp_name))
+			else:
+				con.execute("DELETE FROM experiments WHERE output_name = ? AND exp_name = ?", (output_name, exp_name))
+				con.execute("DELETE FROM stage_timings WHERE output_name = ? AND exp_name = ?", (output_name, exp_name))
+	con.close()
+
+# Rows (as dictionaries with the given columns) that are stored for an experiment
+def get_experiment(output_name, exp_name, columns):
+	con = connect()
+	add_columns(con, "experiments", columns)
+	query = "SELECT %s FROM experiments WHERE output_name = ? AND exp_name = ? ORDER BY rowid"
+	query %= ", ".join(["\"%s\"" % col for col in columns])
+	rows = con.execute(query, (output_name, exp_name)).fetchall()
+	con.close()
+	return [dict(zip(columns, row)) for row in rows]
+
+# Store all rows of one experiment together with the resource usage of its stages (as one
+# transaction such that an experiment is either stored completely or not at all)
+# rows:			Dictionaries with experiment parameters and outputs (one per row, same experiment name)
+# usage:		Resource usage per stage (dictionaries with the usage columns)
+def store_experiment(output_name, position, rows, usage = {}):
+	exp_name = rows[0]["exp_name"]
+	con = connect()
+	with con:
+		con.execute("DELETE FROM experiments WHERE output_name = ? AND exp_name = ?", (output_name, exp_name))
+		for values in rows:
+			add_columns(con, "experiments", values.keys())
+			columns = ["output_name", "position", "created"] + list(values.keys())
+			row = [output_name, position, time.time()] + list(values.values())
+			query = "INSERT INTO experiments (%s) VALUES (%s)" % (", ".join(["\"%s\"" % col for col in columns]), ", ".join(["?"] * len(row)))
+			con.execute(query, row)
+		con.execute("DELETE FROM stage_timings WHERE output_name = ? AND exp_name = ?", (output_name, exp_name))
+		add_columns(con, "stage_timings", usage_columns)
+		for stage in usage:
+			columns = ["output_name", "exp_name", "stage", "created"] + usage_columns
+			row = [output_name, exp_name, stage, time.time()] + [usage[stage][col] for col in usage_columns]
+			query = "INSERT INTO stage_timings (%s) VALUES (%s)" % (", ".join(columns), ", ".join(["?"] * len(row)))
+			con.execute(query, row)
+	con.close()
+
+# Export the experiments that belong to an output to a csv file
+# columns:	Columns to export (in this order)
+def export_experiments(output_name, columns, file_name):
+	con = connect()
+	add_columns(con, "experiments", columns)
+	query = "SELECT %s FROM experiments WHERE output_name = ? ORDER BY position, rowid"
+	query %= ", ".join(["\"%s\"" % col for col in columns])
+	rows = con.execute(query, (output_name,)).fetchall()
+	con.close()
+	with open(file_name, "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(columns)
+		writer.writerows(rows)
+
+# Export the resource usage of all stages of the experiments that belong to an output to a csv file
+def export_stage_timings(output_name, file_name):
+	con = connect()
+	add_columns(con, "stage_timings", usage_columns)
+	columns = ["exp_name", "stage"] + usage_columns
+	query = "SELECT %s FROM stage_timings WHERE output_name = ? ORDER BY rowid" % ", ".join(columns)
+	rows = con.execute(query, (output_name,)).fetchall()
+	con.close()
+	with open(file_name, "w", newline = '') as csv_file:
+		writer = csv.writer(csv_file)
+		writer.writerow(columns)
+		writer.writerows(rows)
+
+# Parse a curve into an array with one row per (load, value) pair (also accepts Python tuple literals)
+def parse_curve(text):
+	values = json.loads(text.replace("(", "[").replace(")", "]")) if type(text) == str else []
+	return np.array(values, dtype = float).reshape(-1, 2)
+
+# Export the experiments that belong to an output to a typed columnar file: Parquet (file_base.parquet)
+# if pyarrow is available and a NumPy archive (file_base.npz) otherwise. Numeric columns are stored as
+# numbers (missing values as NaN), curves as nested arrays with one (load, value) pair per entry. In
+# the NumPy archive, each curve column is stored as "<column>.values" (all pairs of all rows) and
+# "<column>.offsets" (index of the first pair of each row plus the total number of pairs).
+# columns:	Columns to export (in this order)
+def export_columnar(output_name, columns, file_base):
+	con = connect()
+	add_columns(con, "experiments", columns)
+	query = "SELECT %s FROM experiments WHERE output_name = ? ORDER BY position, rowid"
+	query %= ", ".join(["\"%s\"" % col for col in columns])
+	rows = con.execute(query, (output_name,)).fetchall()
+	con.close()
+	arrays = {}
+	for (idx, col) in enumerate(columns):
+		values = [row[idx] for row in rows]
+		present = [value for value in values if value != None]
+		if col in curve_columns:
+			curves = [parse_curve(value) for value in values]
+			arrays[col + ".values"] = np.concatenate(curves + [np.zeros((0, 2))])
+			arrays[col + ".offsets"] = np.cumsum([0] + [len(curve) for curve in curves])
+		elif all([type(value) == int for value in present]) and len(present) == len(values):
+			arrays[col] = np.array(values, dtype = np.int64)
+		elif all([type(value) in [int, float] for value in present]):
+			arrays[col] = np.array([value if value != None else np.nan for value in values], dtype = float)
+		else:
+			arrays[col] = np.array([str(value) if value != None else "" for value in values], dtype = str)
+	for old_file in [file_base + ".parquet", file_base + ".npz"]:
+		if os.path.exists(old_file):
+			os.remove(old_file)
+	if pa != None:
+		table = {}
+		for col in columns:
+			if col in curve_columns:
+				(values, offsets) = (arrays[col + ".values"], arrays[col + ".offsets"])
+				pairs = pa.FixedSizeListArray.from_arrays(pa.array(values.reshape(-1)), 2)
+				table[col] = pa.ListArray.from_arrays(pa.array(offsets, type = pa.int32()), pairs)
+			else:
+				table[col] = pa.array(arrays[col])
+		pq.write_table(pa.table(table), file_base + ".parquet")
+	else:
+		np.savez(file_base + ".npz", **arrays)
+
+# Load experiments from the typed columnar file (see export_columnar) or, if there is none, from the
+# csv file. Returns a data frame in which each curve is an array with one row per (load, value) pair.
+def load_experiments(file_base):
+	if pa != None and os.path.exists(file_base + ".parquet"):
+		table = pq.read_table(file_base + ".parquet")
+		columns = {}
+		for col in table.column_names:
+			if col in curve_columns:
+				curves = table.column(col).combine_chunks()
+				values = curves.flatten().flatten().to_numpy(zero_copy_only = False).reshape(-1, 2)
+				columns[col] = split_curves(values, curves.offsets.to_numpy())
+			else:
+				columns[col] = table.column(col).to_numpy()
+		return pd.DataFrame(columns)
+	elif os.path.exists(file_base + ".npz"):
+		archive = np.load(file_base + ".npz")
+		columns = {}
+		for key in archive.files:
+			if key.endswith(".values"):
+				col = key[:-len(".values")]
+				columns[col] = split_curves(archive[key], archive[col + ".offsets"])
+			elif not key.endswith(".offsets"):
+				columns[key] = archive[key]
+		return pd.DataFrame(columns)
+	else:
+		df = pd.read_csv(file_base + ".csv")
+		for col in curve_columns:
+			if col in df:
+				df[col] = [parse_curve(value) for value in df[col]]
+		return df
+
+# Split the pairs of all rows into one array per row (views, no copies)
+def split_curves(values, offsets):
+	curves = np.empty(len(offsets) - 1, dtype = object)
+	for (idx, curve) in enumerate(np.split(values, offsets[1:-1])):
+		curves[idx] = curve
+	return curves
@@ -1,12 +1,202 @@
 # Libraries
 import subprocess
+import signal
 import sys
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+
+# Custom files
+from booksim_stats import BookSimStats, ReplicatedStats
+from error import warning
+import sim_cache
+import results_db
+import instrumentation
 import config as cfg
 
-# Run BookSim with varying loads
-def run_booksim(topo, traffic, routing, loads, is_coarse = True):
-	# Files for results and logs
-	res_file_name = cfg.bs_results + "results-%s-%s-%s.csv" % (topo, traffic, routing)
+# Settings
+use_cache = True		# Reuse outputs of earlier simulations with identical inputs (see sim_cache.py)
+max_latency = None		# Abort simulations (and treat them as unstable) once a sample's latency exceeds this bound
+timeout_in_s = None		# Abort simulations that take longer than this (wall-clock time)
+max_memory_in_mb = None	# Abort simulations whose resident memory exceeds this limit
+
+# Resident memory of a process in MB (0 if it can not be determined)
+def get_rss_in_mb(pid):
+	try:
+		with open("/proc/%d/status" % pid, "r") as status_file:
+			for line in status_file:
+				if line.startswith("VmRSS:"):
+					return int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	return 0
+
+# Start BookSim and supervise it while it runs: The output is read line by line and the simulation
+# is killed as soon as it reports to be unstable or exceeds one of the limits in the settings above.
+# The simulation is also killed once the (optional) cancel event is set. Returns the output and the
+# reason for aborting ("unstable", "latency", "timeout", "memory" or "cancelled"; None if the
+# simulation completed)
+def supervise(args, cancel = None):
+	proc = subprocess.Popen(args, stdout = subprocess.PIPE, text = True, errors = "replace")
+	abort_reasons = []
+	lock = threading.Lock()
+	def abort(reason):
+		with lock:
+			if len(abort_reasons) == 0:
+				abort_reasons.append(reason)
+				# Send signal directly since Popen.kill might reap the process (which is done by wait4 below)
+				os.kill(proc.pid, signal.SIGKILL)
+	# Watchdog for cancellation, wall-clock time and memory limits
+	done = threading.Event()
+	def watchdog():
+		start = time.time()
+		while not done.wait(0.1):
+			if cancel != None and cancel.is_set():
+				abort("cancelled")
+			if timeout_in_s != None and time.time() - start > timeout_in_s:
+				abort("timeout")
+			if max_memory_in_mb != None and get_rss_in_mb(proc.pid) > max_memory_in_mb:
+				abort("memory")
+	watchdog_thread = None
+	if cancel != None or timeout_in_s != None or max_memory_in_mb != None:
+		watchdog_thread = threading.Thread(target = watchdog, daemon = True)
+		watchdog_thread.start()
+	# Read output and check the latency of each sample period (before the overall statistics)
+	lines = []
+	is_overall = False
+	for line in proc.stdout:
+		lines.append(line)
+		if "Simulation unstable" in line:
+			abort("unstable")
+		elif line.startswith("====== Overall Traffic Statistics"):
+			is_overall = True
+		elif max_latency != None and not is_overall and line.startswith("Packet latency average"):
+			if float(line.split("=")[1].split()[0]) > max_latency:
+				abort("latency")
+	# Stop watchdog before reaping the process (such that it can not be killed afterwards) and record its resource usage
+	done.set()
+	if watchdog_thread != None:
+		watchdog_thread.join()
+	(pid, status, rusage) = os.wait4(proc.pid, 0)
+	proc.returncode = os.waitstatus_to_exitcode(status)
+	instrumentation.record_booksim(rusage)
+	return ("".join(lines), abort_reasons[0] if len(abort_reasons) > 0 else None)
+
+# Run a single BookSim simulation and return its statistics together with the captured output.
+# All run-specific parameters are passed as command-line overrides such that the shared
+# configuration file is never modified and multiple simulations can run at the same time.
+# If the cache is enabled, BookSim is only started if no simulation with identical inputs was run before.
+# cancel:	Event that kills the simulation once it is set (see supervise)
+# seed:		Seed of the random number generator (None = seed of the configuration file)
+def simulate(topo, traffic, routing, load, cancel = None, seed = None):
+	args = [cfg.bs_binary, cfg.bs_config]
+	args.append("network_file=" + cfg.bs_topologies + topo + ".anynet")
+	args.append("injection_rate=" + str(load))
+	args.append("traffic=" + traffic)
+	args.append("routing_function=" + routing)
+	if seed != None:
+		args.append("seed=" + str(seed))
+	# Look up simulation in cache
+	key = sim_cache.get_key(args) if use_cache else None
+	out = sim_cache.load(key) if use_cache else None
+	if out != None:
+		stats = BookSimStats(out)
+	else:
+		# Run and supervise simulation
+		(out, abort_reason) = supervise(args, cancel)
+		if abort_reason != None:
+			out += "Simulation aborted by supervisor (%s)\n" % abort_reason
+		stats = BookSimStats(out, abort_reason)
+		# Only cache simulations that produced a result which does not depend on the limits in the settings
+		if use_cache and stats.status != "failed" and abort_reason in [None, "unstable"]:
+			sim_cache.store(key, out)
+	return (stats, stats.log)
+
+# Run n_seeds BookSim simulations of the same point at the same time and aggregate their statistics
+# (see booksim_stats.ReplicatedStats). The first simulation uses the seed of the configuration file
+# (such that it is identical to the one of a single simulation), simulation i uses seed i.
+def simulate_replicated(topo, traffic, routing, load, cancel = None, n_seeds = 1):
+	if n_seeds == 1:
+		return simulate(topo, traffic, routing, load, cancel)
+	with ThreadPoolExecutor(max_workers = n_seeds) as pool:
+		futures = [pool.submit(simulate, topo, traffic, routing, load, cancel, seed if seed > 0 else None) for seed in range(n_seeds)]
+		stats = ReplicatedStats([future.result()[0] for future in futures])
+	return (stats, stats.log)
+
+# Run BookSim for multiple loads at the same time
+# n_workers:	Number of concurrent simulations (None = number of CPU cores)
+# n_seeds:		Number of simulations with different seeds per load (see simulate_replicated)
+# pool:			Executor shared with other sweeps (None = own pool with n_workers threads)
+def simulate_loads(topo, traffic, routing, loads, n_workers = None, n_seeds = 1, pool = None):
+	n_workers = os.cpu_count() if n_workers == None else n_workers
+	# Threads are sufficient since every simulation runs in its own BookSim process
+	with ThreadPoolExecutor(max_workers = max(1, n_workers // n_seeds)) if pool == None else nullcontext(pool) as pool:
+		futures = {load : pool.submit(simulate_replicated, topo, traffic, routing, load, None, n_seeds) for load in loads}
+		return {load : futures[load].result() for load in loads}
+
+# Run BookSim for multiple loads at the same time, starting with the lowest loads. As soon as a load
+# is saturated (unstable, failed, or latency above twice the zero-load latency), all simulations at
+# higher loads are cancelled: queued ones are never started and running ones are killed. Only the
+# loads up to the lowest saturated one are returned, such that the result does not depend on timing.
+# zero_load_latency:	Latency at zero load (None = latency at the lowest load)
+def simulate_loads_speculative(topo, traffic, routing, loads, n_workers = None, zero_load_latency = None, n_seeds = 1, pool = None):
+	n_workers = os.cpu_count() if n_workers == None else n_workers
+	cancel = {load : threading.Event() for load in loads}
+	outputs = {}
+	with ThreadPoolExecutor(max_workers = max(1, n_workers // n_seeds)) if pool == None else nullcontext(pool) as pool:
+		futures = {load : pool.submit(simulate_replicated, topo, traffic, routing, load, cancel[load], n_seeds) for load in sorted(loads)}
+		loads_of_futures = {futures[load] : load for load in loads}
+		for future in as_completed(loads_of_futures):
+			load = loads_of_futures[future]
+			if cancel[load].is_set():
+				continue
+			outputs[load] = future.result()
+			# Determine lowest saturated load (without a given zero-load latency, saturation by latency is only
+			# known once the lowest load finished)
+			reference = zero_load_latency
+			if reference == None and min(loads) in outputs and outputs[min(loads)][0].status == "ok":
+				reference = outputs[min(loads)][0].get_latency()
+			saturated = [l for l in outputs if outputs[l][0].status != "ok" or \
+						 (reference != None and outputs[l][0].get_latency() > 2 * reference)]
+			# Cancel simulations at higher loads
+			for l in loads:
+				if len(saturated) > 0 and l > min(saturated) and not cancel[l].is_set():
+					cancel[l].set()
+					futures[l].cancel()
+	n_cancelled = len([load for load in loads if cancel[load].is_set()])
+	if n_cancelled > 0:
+		print("Cancelled %d simulations at loads beyond saturation" % n_cancelled)
+	return {load : outputs[load] for load in loads if load in outputs and not cancel[load].is_set()}
+
+# Append the output of one simulation to the logfile
+def log_simulation(log_file_name, topo, traffic, routing, load, out_str):
+	with open(log_file_name, "a") as log_file:
+		log_file.write("\n\n*** %s - %s - %s - %f ***\n\n" % (topo, traffic, routing, load))
+		log_file.write(out_str)
+
+# Store the statistics of all loads in the results database and export them to the results file
+def write_results(topo, traffic, routing, results):
+	results_db.store_simulations(topo, traffic, routing, results)
+	results_db.export_simulations(topo, traffic, routing, cfg.bs_results + "results-%s-%s-%s.csv" % (topo, traffic, routing))
+
+# Report a simulation that did not produce any statistics
+def report_failed_simulation(topo, traffic, routing, load, log_file_name):
+	msg = "BookSim did not report any statistics for %s - %s - %s at load %f, see \"%s\""
+	msg %= (topo, traffic, routing, load, log_file_name)
+	warning(__file__, msg)
+
+# Run BookSim with varying loads and return the statistics for each load
+# n_workers:			Number of concurrent simulations (1 = sequential, None = number of CPU cores)
+# speculative:			Cancel simulations beyond the first saturated load (see simulate_loads_speculative)
+#						which means that the latency-vs-load curve ends at the first saturated load
+# zero_load_latency:	Latency at zero load for speculative mode (None = latency at the lowest load)
+# n_seeds:				Number of simulations with different seeds per load, their statistics are aggregated
+#						into a mean and confidence interval (see simulate_replicated)
+# pool:					Executor shared with other sweeps (see run_booksim_batch), implies parallel mode
+def run_booksim(topo, traffic, routing, loads, is_coarse = True, n_workers = 1, speculative = False, zero_load_latency = None, n_seeds = 1, pool = None):
+	# Logfile
 	log_file_name = cfg.bs_logs + "log-%s-%s-%s.log" % (topo, traffic, routing)
 	# Simulation results
 	results = {}
@@ -14,72 +204,151 @@ def run_booksim(topo, traffic, routing, loads, is_coarse = True):
 	# Add header to logfile
 	with open(log_file_name, "w") as log_file:
 		log_file.write("Creating log for %s - %s - %s" % (topo, traffic, routing))
+	# In parallel mode, simulate all loads upfront and replay the sequential logic below in load order
+	is_parallel = n_workers != 1 or pool != None
+	if not is_parallel:
+		outputs = {}
+	elif speculative:
+		outputs = simulate_loads_speculative(topo, traffic, routing, loads, n_workers, zero_load_latency, n_seeds, pool)
+	else:
+		outputs = simulate_loads(topo, traffic, routing, loads, n_workers, n_seeds, pool)
 	# Iterate through loads
 	lval = None
 	for load in loads:
-		print("-> " + str(load) + " => ", end = '')
-		# Read and update configuration
-		with open("../booksim2/src/anynet.conf", "r") as cfg_file:
-			lines = cfg_file.readlines()
-		lines[0] = "network_file = " + cfg.bs_topologies + topo + ".anynet;\n"
-		lines[1] = "injection_rate = " + str(load) + ";\n"
-		lines[2] = "traffic = " + traffic + ";\n"
-		lines[3] = "routing_function = " + routing + ";\n"
-		with open("../booksim2/src/anynet.conf", "w") as cfg_file:
-			cfg_file.writelines(lines)
-		# Start simulation and capture output
-		proc = subprocess.Popen(['../booksim2/src/booksim', "../booksim2/src/anynet.conf"], stdout=subprocess.PIPE)
-		out = proc.stdout.read()
-		# Write lowest 50 lines of output to logfile
-		out_list = str(out)[1:-1].split("\\n")[-50:]
-		out_str = ""
-		for line in out_list:
-			out_str += line + "\n"	
-		with open(log_file_name, "a") as log_file:
-			log_file.write("\n\n*** %s - %s - %s - %f ***\n\n" % (topo, traffic, routing, load))	
-			log_file.write(out_str)
-		val = -1
-		if "unstable" in out_str:
-			val = 1000
-		else:
-			try:
-				tmp = out_list[-29].split(" ")	
-				for j in range(len(tmp)-1):
-					if tmp[j] == "=":
-						val = float(tmp[j+1])
-						break
-			except:
-				val = -1
-		# Store and print result
-		results[load] = val
-		print(val)
+		# Stop at simulations that were cancelled in speculative mode
+		if is_parallel and load not in outputs:
+			break
+		(stats, out_str) = outputs[load] if load in outputs else simulate_replicated(topo, traffic, routing, load, n_seeds = n_seeds)
+		log_simulation(log_file_name, topo, traffic, routing, load, out_str)
+		# Stop simulations if BookSim failed (one print per load such that concurrent sweeps do not mix lines)
+		val = stats.get_latency()
+		print("-> " + str(load) + " => " + str((val if val != None else stats.status) if stats.get_latency_ci() == None else "%s +- %s" % (val, stats.get_latency_ci())))
+		if val == None:
+			report_failed_simulation(topo, traffic, routing, load, log_file_name)
+			break
+		# Store result
+		results[load] = stats
 		# Run fine grained simulations
-		if (val < 0 or (lval != None and (lval * 1.5 < val))) and is_coarse and load >= 0.1:
+		if (lval != None and (lval * 1.5 < val)) and is_coarse and load >= 0.1:
 			fine_loads = [round(load - 0.1 + x / 100,2) for x in range(1,10)]
-			fine_results = run_booksim(topo, traffic, routing, fine_loads, False)
+			zero_load_latency = results[loads[0]].get_latency() if zero_load_latency == None else zero_load_latency
+			fine_results = run_booksim(topo, traffic, routing, fine_loads, False, n_workers, speculative, zero_load_latency, n_seeds, pool)
 			for fine_load in fine_results:
 				results[fine_load] = fine_results[fine_load]
 		lval = val
-		# Stop simulations 
-		if val < 0 or val >= 1000:	
+		# Stop simulations
+		if stats.status == "unstable":
 			break
 	if is_coarse:
-		with open(res_file_name, "w") as res_file:
-			for load in sorted(results):
-				res_file.write("%f, %f\n" % (load, results[load]))
-	else:
-		return results
+		write_results(topo, traffic, routing, results)
+	return results
+
+# Number of simulations that run_booksim needs to locate a given saturation throughput:
+# All coarse loads up to the first saturated one plus one refinement with 9 fine loads.
+def count_grid_simulations(loads, throughput, is_saturated = True):
+	n_coarse = min(len([load for load in loads if load < throughput]) + 1, len(loads))
+	n_fine = 9 if is_saturated and loads[n_coarse - 1] >= 0.1 else 0
+	return n_coarse + n_fine
+
+# Search the saturation throughput by bracketing it on the latency-vs-load curve.
+# A load is saturated if its latency exceeds twice the zero-load latency (same
+# definition as in run_experiment). With n_workers > 1, each step simulates n_workers
+# equally spaced loads inside the bracket at the same time (bisection for n_workers = 1).
+# Loads are snapped to multiples of the tolerance. The results are stored in the same way
+# as the ones of run_booksim. Returns the statistics for each load, the number of
+# simulations and the number of simulations that the load grid would have needed.
+# loads:		Grid of run_booksim, first and last entry are the bounds of the search
+# tolerance:	Maximum width of the final bracket
+# n_seeds:		Number of simulations with different seeds per load (see simulate_replicated)
+# pool:			Executor shared with other sweeps (see run_booksim_batch)
+def search_saturation(topo, traffic, routing, loads, tolerance = 0.01, n_workers = 1, n_seeds = 1, pool = None):
+	# Logfile
+	log_file_name = cfg.bs_logs + "log-%s-%s-%s.log" % (topo, traffic, routing)
+	n_workers = os.cpu_count() if n_workers == None else n_workers
+	# Simulation results and loads for which BookSim failed
+	results = {}
+	failed = []
+	print("=== %s - %s - %s (saturation search) ===" % (topo, traffic, routing))
+	# Add header to logfile
+	with open(log_file_name, "w") as log_file:
+		log_file.write("Creating log for %s - %s - %s" % (topo, traffic, routing))
+	# Simulate a batch of loads and store the results
+	def run_batch(batch):
+		outputs = simulate_loads(topo, traffic, routing, batch, n_workers, n_seeds, pool)
+		for load in batch:
+			(stats, out_str) = outputs[load]
+			log_simulation(log_file_name, topo, traffic, routing, load, out_str)
+			print("-> " + str(load) + " => " + str(stats.get_latency() if stats.status != "failed" else stats.status))
+			if stats.status == "failed":
+				report_failed_simulation(topo, traffic, routing, load, log_file_name)
+				failed.append(load)
+			else:
+				results[load] = stats
+	# Zero-load latency and upper bound of the search (failed simulations count as saturated)
+	run_batch([loads[0]])
+	is_saturated = lambda load: load in failed or loads[0] in failed or results[load].status == "unstable" or \
+								results[load].get_latency() > 2 * results[loads[0]].get_latency()
+	if not is_saturated(loads[0]):
+		run_batch([loads[-1]])
+	# Shrink bracket [lo, hi] with lo being the highest stable and hi the lowest saturated load
+	(lo, hi) = (loads[0], loads[-1])
+	while not is_saturated(lo) and is_saturated(hi) and hi - lo > tolerance:
+		n_points = max(1, min(n_workers // n_seeds, int(round((hi - lo) / tolerance)) - 1))
+		batch = [lo + (hi - lo) * (i + 1) / (n_points + 1) for i in range(n_points)]
+		batch = [round(round(load / tolerance) * tolerance, 4) for load in batch]
+		batch = sorted(set([load for load in batch if lo < load < hi and load not in results and load not in failed]))
+		if len(batch) == 0:
+			break
+		run_batch(batch)
+		for load in batch:
+			if is_saturated(load):
+				hi = min(hi, load)
+			elif load < hi:
+				lo = max(lo, load)
+	# Store results
+	write_results(topo, traffic, routing, results)
+	# Report the number of simulations saved compared to the load grid with refinement
+	saturated_loads = [load for load in list(results) + failed if is_saturated(load)]
+	throughput = min(saturated_loads + [max(list(results) + failed)])
+	n_sims = len(results) + len(failed)
+	n_grid = count_grid_simulations(loads, throughput, len(saturated_loads) > 0)
+	print("Saturation throughput %f found with %d simulations (load grid: %d, saved: %d)" % \
+		  (throughput, n_sims, n_grid, n_grid - n_sims))
+	return (results, n_sims, n_grid)
+
+# Evaluate a topology under all combinations of traffic patterns and routing functions as one batch:
+# The sweeps of all combinations run at the same time and share one pool of n_workers concurrent
+# simulations (and the anynet file of the topology). Returns the result of run_booksim (or of
+# search_saturation in search mode) for each combination, indexed by (traffic, routing).
+def run_booksim_batch(topo, traffics, routings, loads, n_workers = None, speculative = False, n_seeds = 1, search = False, tolerance = 0.01):
+	n_workers = os.cpu_count() if n_workers == None else n_workers
+	combinations = [(traffic, routing) for traffic in traffics for routing in routings]
+	with ThreadPoolExecutor(max_workers = max(1, n_workers // n_seeds)) as pool:
+		# One thread per combination drives its sweep while the simulations run in the shared pool
+		with ThreadPoolExecutor(max_workers = len(combinations)) as drivers:
+			if search:
+				futures = {(traffic, routing) : drivers.submit(search_saturation, topo, traffic, routing, loads, tolerance, n_workers, n_seeds, pool) \
+						   for (traffic, routing) in combinations}
+			else:
+				futures = {(traffic, routing) : drivers.submit(run_booksim, topo, traffic, routing, loads, True, n_workers, speculative, None, n_seeds, pool) \
+						   for (traffic, routing) in combinations}
+			return {combination : futures[combination].result() for combination in combinations}
 
 ### Main ###
 if __name__ == "__main__":
 	loads = [0.01,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,0.99]
 	if len(sys.argv) < 4:
-		print("Usage: run_simulation.py <topology> <traffic> <routing> [load]")
+		print("Usage: run_simulation.py <topology> <traffic[,traffic...]> <routing[,routing...]> [load | all] [#workers] [#seeds]")
 		sys.exit()
 	topo = sys.argv[1]
-	traffic = sys.argv[2]
-	routing = sys.argv[3]
-	one_load = sys.argv[4] if len(sys.argv) > 4 else None
+	traffics = sys.argv[2].split(",")
+	routings = sys.argv[3].split(",")
+	one_load = sys.argv[4] if len(sys.argv) > 4 and sys.argv[4] != "all" else None
+	n_workers = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+	n_seeds = int(sys.argv[6]) if len(sys.argv) > 6 else 1
 	loads = loads if one_load == None else [float(one_load)]
-	run_booksim(topo, traffic, routing, loads)
+	if len(traffics) * len(routings) > 1:
+		run_booksim_batch(topo, traffics, routings, loads, n_workers, n_seeds = n_seeds)
+	else:
+		run_booksim(topo, traffics[0], routings[0], loads, n_workers = n_workers, n_seeds = n_seeds)
 
@@ -1,14 +1,32 @@
 # Libraries
-import csv
 from xml.dom import minidom
+import importlib
+import importlib.util
+import hashlib
+import os
+import json
+import time
 
 # Custom files
 from technology import Technology
 from translate_lm_to_bs import translate_lm_to_bs
-from run_booksim import run_booksim
+from run_booksim import run_booksim, run_booksim_batch, search_saturation
+from estimate_performance import estimate_performance, get_pareto_candidates
 from module import Module
+from scheduler import Scheduler, Task
+from instrumentation import measure, add_usage
+from workspace import Workspace
+from error import error
+import results_db
+import sim_cache
 import config as cfg
 
+# Modules of the toolchain that the topology generators and the simulation rely on (see get_fingerprint)
+toolchain_sources = ["create_tile", "place_and_route", "place_and_route_general", "embed_tile_in_grid", "unit_cell", "module", "translate_lm_to_bs"]
+
+# Experiment parameters that do not influence the generated chip (see get_layout_key)
+layout_independent = ["exp_name", "chip_name", "param_name", "frequency", "traffic", "routing"]
+
 # Load steps used for BookSim
 global_loads = [0.01,0.1,0.2,0.3,0.4,0.5,0.6,0.7,0.8,0.9,0.95,0.99]
 
@@ -48,71 +66,358 @@ outputs = [
 	"noc_power",
 
 	"latency",
+	"latency_ci",
 	"throughput",
+	"network_latency",
+	"hops",
+	"accepted_throughput",
 	"load_lat_pairs",	
+	"load_acc_pairs",
+
+	"estimated_latency",
+	"estimated_throughput",
+	"simulated",
+
+	"status",
+	"error",
 ]
 
+# Gather the results of one experiment
+# chip:			Cost of the chip under test (see load_stage)
+# estimate:		Analytical performance estimate (see estimate_performance.py)
+# simulated:	Whether the experiment was simulated
+# bs_results:	BookSim statistics for each load (empty if the experiment was not simulated)
+def get_results(exp, chip, estimate, simulated, bs_results):
+	# Load technology info
+	tech = Technology(exp["technology"])
+
+	# Gather results...
+	results = {}
+	# ...Extract area
+	results["no_noc_area"] = tech.mm2_per_ge * exp["tiles"] * exp["tile_area"]
+	results["total_area"] = chip["total_area"]
+	results["logic_area"] = chip["logic_area"]
+	results["wire_area"] = chip["wire_area"]
+	results["empty_area"] = chip["empty_area"]
+	results["area_overhead"] = (results["total_area"] - results["no_noc_area"]) / results["total_area"]
+	# ...Extract power 
+	results["no_noc_power"] = tech.w_per_mm2_logic * results["no_noc_area"]
+	results["total_power"] = chip["total_power"]
+	results["logic_power"] = chip["logic_power"]
+	results["wire_power"] = chip["wire_power"]
+	results["noc_power"] = max(results["total_power"] - results["no_noc_power"],0)
+
+	# ...Extract estimates
+	results["estimated_latency"] = estimate["latency"]
+	results["estimated_throughput"] = estimate["throughput"]
+	results["simulated"] = simulated
+	results["status"] = "ok"
+	results["error"] = None
+	# ...Extract BookSim results (empty for experiments that were not simulated)
+	latencies = {load : bs_results[load].get_latency() for load in sorted(bs_results)}
+	accepted = {load : bs_results[load].classes[0].accepted_flit_rate.average for load in latencies if bs_results[load].status == "ok"}
+	results["load_lat_pairs"] = json.dumps([[load, latencies[load]] for load in latencies])
+	results["load_acc_pairs"] = json.dumps([[load, accepted[load]] for load in accepted])
+	results["latency"] = min(latencies.values()) if len(latencies) > 0 else None
+	results["latency_ci"] = bs_results[min(latencies, key = latencies.get)].get_latency_ci() if len(latencies) > 0 else None
+	results["throughput"] = min([x for x in  latencies.keys() if latencies[x] > 2 * results["latency"]] + [max(latencies.keys())]) if len(latencies) > 0 else None
+	zero_load = bs_results[min(accepted, key = latencies.get)].classes[0] if len(accepted) > 0 else None
+	results["network_latency"] = zero_load.network_latency.average if zero_load != None else None
+	results["hops"] = zero_load.hops.average if zero_load != None else None
+	results["accepted_throughput"] = max(accepted.values()) if len(accepted) > 0 else (0 if len(latencies) > 0 else None)
+	return results
+
+# Stages of an experiment, each of them runs as a task of the scheduler (see run_experiment)
+# Generate topology under test (the generator is given by its module name). A chip that was generated
+# with the same layout (see get_layout_key) in the same workspace is reused, e.g. by the experiment service.
+def generate_stage(exp):
+	layout_file = cfg.module_path + exp["chip_name"] + ".layout"
+	layout = get_fingerprint({param : exp[param] for param in exp if param not in layout_independent}, ())
+	if os.path.exists(cfg.module_path + exp["chip_name"] + ".xml") and os.path.exists(layout_file):
+		with open(layout_file, "r") as f:
+			if f.read() == layout:
+				print("Reusing generated chip \"%s\"" % exp["chip_name"])
+				return
+	generator = importlib.import_module(exp["topology_generator"])
+	generator.generate(	exp["chip_name"], exp["tile_area"], \
+						exp["endpoints"],
+						exp["technology"], exp["protocol"],
+						exp["bandwidth"], exp["frequency"],
+						exp["rows"], exp["cols"], exp["topology_config"])
+	with open(layout_file, "w") as f:
+		f.write(layout)
+
+# Load chip under test and estimate its performance analytically. The experiments share one layout
+# (see get_layout_key), the chip generated for the first one is loaded once and retargeted to the
+# frequency of each experiment. Returns for each experiment the cost of the chip, the estimate and the
+# logical model but not the module itself (and the resource usage of estimating and of loading or retargeting:
+# Loading is charged to the first experiment only, like generating the chip, retargeting to each experiment).
+def load_stage(experiments, generated):
+	(top, load_usage) = measure(Module, experiments[0]["chip_name"])
+	chips = []
+	for (i, exp) in enumerate(experiments):
+		usage = {"load" : load_usage} if i == 0 else {}
+		if top.frequency != exp["frequency"]:
+			(_, retarget_usage) = measure(top.set_frequency, exp["frequency"])
+			usage["load"] = add_usage(usage["load"], retarget_usage) if "load" in usage else retarget_usage
+		chip = {}
+		chip["total_area"] = top.total_area_in_mm2
+		chip["logic_area"] = top.logic_area_in_mm2
+		chip["wire_area"] = top.wire_area_in_mm2
+		chip["empty_area"] = top.empty_area_in_mm2
+		chip["total_power"] = top.total_power_in_w
+		chip["logic_power"] = top.logic_power_in_w
+		chip["wire_power"] = top.wire_power_in_w
+		chip["graph"] = (top.vertices, top.edges, top.edge_delays)
+		(chip["estimate"], usage["estimate"]) = measure(estimate_performance, top.vertices, top.edges, top.edge_delays)
+		chip["usage"] = usage
+		chips.append(chip)
+	return chips
+
+# Select the experiments to simulate: All of them or (with prefilter) those whose estimated area,
+# latency and throughput are near the Pareto front of their parameter, traffic and routing
+# stored:	Cost and estimate of experiments with stored results (indexed by experiment index)
+# layouts:	Indices of the experiments that were loaded (grouped by layout), the cost and estimate of
+#			each group follow as arguments (None for groups that failed, they are not selected)
+def select_stage(experiments, prefilter, stored, layouts, *loaded):
+	chips = dict(stored)
+	for (group, group_chips) in zip(layouts, loaded):
+		if group_chips != None:
+			chips.update(zip(group, group_chips))
+	selected = list(range(len(experiments)))
+	if prefilter != None:
+		selected = []
+		groups = {}
+		for (exp_idx, exp) in enumerate(experiments):
+			if exp_idx not in chips:
+				continue
+			groups.setdefault((exp["param_name"], str(exp["traffic"]), str(exp["routing"])), []).append(exp_idx)
+		for group in groups.values():
+			costs = [(chips[idx]["total_area"], \
+					  chips[idx]["estimate"]["latency"] if chips[idx]["estimate"]["latency"] != None else float("inf"), \
+					  1 / chips[idx]["estimate"]["throughput"] if chips[idx]["estimate"]["throughput"] > 0 else float("inf")) for idx in group]
+			selected += [group[idx] for idx in get_pareto_candidates(costs, prefilter)]
+		print("Pre-filter selected %d of %d experiments for simulation" % (len(selected), len(experiments)))
+	return selected
+
+# Export topology to BookSim if the experiment was selected
+# position:	Position of the experiment among the experiments with the same layout
+def translate_stage(exp, exp_idx, position, chips, selected):
+	if exp_idx not in selected:
+		return False
+	translate_lm_to_bs(exp["chip_name"], *chips[position]["graph"])
+	return True
+
+# Run BookSim experiments for all combinations of traffic patterns and routing functions (as one batch).
+# Returns the statistics for each combination (empty if the experiment was not selected) and the
+# number of simulations run in search mode and needed by the load grid.
+def simulate_stage(exp, settings, translated):
+	traffics = exp["traffic"] if type(exp["traffic"]) == list else [exp["traffic"]]
+	routings = exp["routing"] if type(exp["routing"]) == list else [exp["routing"]]
+	batch_results = {(traffic, routing) : {} for traffic in traffics for routing in routings}
+	if not translated:
+		return (batch_results, 0, 0)
+	(n_workers, search, tolerance, speculative, n_seeds) = settings
+	if len(batch_results) > 1:
+		batch_results = run_booksim_batch(exp["chip_name"], traffics, routings, global_loads, n_workers, speculative, n_seeds, search, tolerance)
+	elif search:
+		batch_results = {(traffics[0], routings[0]) : search_saturation(exp["chip_name"], traffics[0], routings[0], global_loads, tolerance, n_workers, n_seeds)}
+	else:
+		batch_results = {(traffics[0], routings[0]) : run_booksim(exp["chip_name"], traffics[0], routings[0], global_loads, n_workers = n_workers, speculative = speculative, n_seeds = n_seeds)}
+	(n_sims, n_grid) = (0, 0)
+	if search:
+		n_sims = sum([batch_results[combination][1] for combination in batch_results])
+		n_grid = sum([batch_results[combination][2] for combination in batch_results])
+		batch_results = {combination : batch_results[combination][0] for combination in batch_results}
+	for (traffic, routing) in batch_results:
+		if len(batch_results[(traffic, routing)]) == 0:
+			msg = "BookSim did not produce any results for experiment \"%s\" (%s, %s)"
+			msg %= (exp["exp_name"], traffic, routing)
+			error(__file__, msg)
+	return (batch_results, n_sims, n_grid)
+
+# Experiments that only differ in their frequency (or in the traffic and routing) share the same
+# layout: The frequency only influences the delays of the logical model, not the routed module.
+def get_layout_key(exp):
+	return str([(param, exp[param]) for param in sorted(exp) if param not in layout_independent])
+
+# Fingerprint of an experiment: Hash of its parameters, the settings that influence its results and
+# its inputs (technology and protocol descriptions, source code of the topology generator and of the
+# toolchain, BookSim configuration and binary)
+def get_fingerprint(exp, settings):
+	key = hashlib.sha256()
+	for param in sorted(exp):
+		key.update(("%s=%s;" % (param, exp[param])).encode())
+	key.update(str(settings).encode())
+	key.update(sim_cache.hash_file(cfg.technology_path + exp["technology"] + ".xml").encode())
+	key.update(sim_cache.hash_file(cfg.protocol_path + exp["protocol"] + ".xml").encode())
+	key.update(sim_cache.hash_file(importlib.util.find_spec(exp["topology_generator"]).origin).encode())
+	for source in toolchain_sources:
+		key.update(sim_cache.hash_file(importlib.util.find_spec(source).origin).encode())
+	key.update(sim_cache.hash_file(cfg.bs_config).encode())
+	key.update(sim_cache.hash_file(cfg.bs_binary).encode())
+	return key.hexdigest()
+
+# Print where the time of a run went: Resource usage summed over all experiments for each stage
+# usage:	List of resource usages (see instrumentation.measure) for each stage
+def print_usage_summary(usage, wall_time):
+	total = sum([u["wall_time_in_s"] for stage in usage for u in usage[stage]])
+	print("Resource usage of %d stages (total wall-clock time: %.1f s)" % (sum([len(usage[stage]) for stage in usage]), wall_time))
+	print("%-10s %12s %12s %15s %15s %8s" % ("Stage", "Wall [s]", "CPU [s]", "Peak RSS [MB]", "BookSim runs", "Share"))
+	for stage in ["generate", "load", "estimate", "translate", "simulate"]:
+		if stage not in usage:
+			continue
+		wall = sum([u["wall_time_in_s"] for u in usage[stage]])
+		cpu = sum([u["cpu_time_in_s"] for u in usage[stage]])
+		rss = max([u["peak_rss_in_mb"] for u in usage[stage]])
+		runs = sum([u["booksim_invocations"] for u in usage[stage]])
+		print("%-10s %12.1f %12.1f %15.1f %15d %7.1f%%" % (stage, wall, cpu, rss, runs, 100 * wall / total if total > 0 else 0))
+
 # Function to run a list of experiments 
-def run_experiment(experiments, output_filename):
-	# Write header to results file
-	with open(cfg.eval_results + output_filename + ".csv", "w") as out_file: 
-		out_file.write(str(parameters)[1:-1].replace("'","").replace(" ","") + ",")
-		out_file.write(str(outputs)[1:-1].replace("'","").replace(" ","") + "\n")
-	# Iterate through experiments
-	for exp in experiments:		
-		# Generate topology under test
-		exp["topology_generator"].generate(	exp["chip_name"], exp["tile_area"], \
-											exp["endpoints"],
-											exp["technology"], exp["protocol"],
-											exp["bandwidth"], exp["frequency"],
-											exp["rows"], exp["cols"], exp["topology_config"])
-		# Load chip under test
-		top = Module(exp["chip_name"])
-		# Export topology to BookSim
-		translate_lm_to_bs(exp["chip_name"], top.vertices, top.edges, top.edge_delays)
-		# Run BookSim experiments
-		run_booksim(exp["chip_name"], exp["traffic"], exp["routing"], global_loads)
-
-		# Load technology info
-		tech = Technology(exp["technology"])
-
-		# Gather results...
-		results = {}
-		# ...Extract area
-		results["no_noc_area"] = tech.mm2_per_ge * exp["tiles"] * exp["tile_area"]
-		results["total_area"] = top.total_area_in_mm2
-		results["logic_area"] = top.logic_area_in_mm2
-		results["wire_area"] = top.wire_area_in_mm2
-		results["empty_area"] = top.empty_area_in_mm2
-		results["area_overhead"] = (results["total_area"] - results["no_noc_area"]) / results["total_area"]
-		# ...Extract power 
-		results["no_noc_power"] = tech.w_per_mm2_logic * results["no_noc_area"]
-		results["total_power"] = top.total_power_in_w
-		results["logic_power"] = top.logic_power_in_w
-		results["wire_power"] = top.wire_power_in_w
-		results["noc_power"] = max(results["total_power"] - results["no_noc_power"],0)
-
-		# ...Read BookSim results
-		bs_filename = cfg.bs_results + "results-%s-%s-%s.csv" % (exp["chip_name"], exp["traffic"], exp["routing"])
-		with open(bs_filename, newline = '') as csvfile:
-			latencies = {}
-			reader = csv.reader(csvfile, delimiter=',', quotechar = '"')
-			for row in reader:
-				if len(row) > 1:
-					load = float(row[0])
-					latency = float(row[1])
-					latencies[load] = latency
-		results["load_lat_pairs"] = "\"" + str(list(zip(latencies.keys(), latencies.values()))) + "\""
-		results["latency"] = min(latencies.values())
-		results["throughput"] = min([x for x in  latencies.keys() if latencies[x] > 2 * results["latency"]] + [max(latencies.keys())])
-
-		# Write results to csv file
-		exp["topology_config"] = "\"" + str(exp["topology_config"]) + "\""
-		with open(cfg.eval_results + output_filename + ".csv", "a") as out_file: 
-			# Write parameters
-			for param in parameters:
-				out_file.write(str(exp[param]) + ",")
-			# Write results 
-			for res in outputs:
-				out_file.write(str(results[res]) + ("," if outputs.index(res) < len(outputs) - 1 else "\n"))
+# n_workers:	Number of concurrent BookSim simulations per experiment (None = number of CPU cores)
+# search:		Search the saturation throughput by bisection instead of simulating the load grid
+# tolerance:	Accuracy of the saturation throughput in search mode
+# speculative:	Cancel simulations beyond the first saturated load when simulating the load grid
+# prefilter:	Only simulate experiments whose estimated area, latency and throughput (see
+#				estimate_performance.py) are within this relative distance of the Pareto front of all
+#				experiments with the same parameter, traffic and routing (None = simulate all)
+# n_seeds:		Number of simulations with different seeds per load, latency and throughput are computed
+#				from their mean (latency_ci is the half-width of the zero-load latency's confidence interval)
+# n_pnr:		Maximum number of experiments in generation, loading or translation at the same time
+#				(None = number of CPU cores)
+# n_sim:		Maximum number of experiments in simulation at the same time (each with up to n_workers
+#				concurrent BookSim simulations, None = number of CPU cores)
+# resume:		Keep the stored results of experiments whose fingerprint (see get_fingerprint) did not change
+#				and only run the experiments that are new or whose parameters or inputs changed
+# workspace:	Workspace in which the chips are generated, translated and simulated (None = a new
+#				temporary workspace that is removed at the end of the run, see workspace.py)
+# collect:		Copy the tiles, modules, BookSim topologies, results and logs from the temporary workspace
+#				into the directories of the repository before it is removed (see Workspace.collect)
+# pools:		Process pools for the "pnr" and "sim" stages that outlive the run (None = create pools
+#				with n_pnr and n_sim processes, see Scheduler)
+# on_stored:	Function that is called with the rows (dictionaries with parameters and outputs) of each
+#				experiment once it is stored, also for the experiments that are up to date (None = no call)
+# Experiments may list multiple traffic patterns and routing functions ("traffic" and "routing"), all
+# combinations are simulated as one batch (see run_booksim_batch) and stored as separate rows.
+# Experiments that only differ in their frequency share one generated chip, which is loaded once and
+# retargeted to each frequency (see get_layout_key and Module.set_frequency).
+# The stages of all experiments form a dependency graph whose tasks run in separate processes as
+# soon as their inputs are available (see scheduler.py). Each experiment is stored in the results
+# database (see results_db.py) as soon as it is finished and the csv file is exported from it (in
+# the order of the experiments). At the end, all experiments are also exported to a typed columnar
+# file (see results_db.export_columnar). The resource usage of each stage of each experiment is stored
+# as well (see instrumentation.py), exported to <output_filename>_stages.csv and summarized at the end.
+# An experiment whose stages raise an error (see error.ToolchainError) is stored with the status
+# "failed" and the error message, the other experiments are not affected.
+def run_experiment(experiments, output_filename, n_workers = 1, search = False, tolerance = 0.01, speculative = False, prefilter = None, n_seeds = 1, n_pnr = 1, n_sim = 1, resume = True, workspace = None, collect = True, pools = None, on_stored = None):
+	# Experiments are passed to other processes, hence generators are given by their module name
+	exps = []
+	for exp in experiments:
+		exps.append(dict(exp))
+		if type(exp["topology_generator"]) != str:
+			exps[-1]["topology_generator"] = exp["topology_generator"].__name__
+	# Remove results of earlier runs (all of them or those that are outdated) and update results file
+	settings = (n_workers, search, tolerance, speculative, n_seeds)
+	fingerprints = [get_fingerprint(exp, (global_loads, search, tolerance, speculative, n_seeds, prefilter)) for exp in exps]
+	if resume:
+		results_db.keep_experiments(output_filename, {exp["exp_name"] : (exp_idx, fingerprints[exp_idx]) for (exp_idx, exp) in enumerate(exps)})
+	else:
+		results_db.clear_experiments(output_filename)
+	results_db.export_experiments(output_filename, parameters + outputs, cfg.eval_results + output_filename + ".csv")
+	stored_fingerprints = results_db.get_fingerprints(output_filename)
+	done = [exp_idx for (exp_idx, exp) in enumerate(exps) if stored_fingerprints.get(exp["exp_name"]) == fingerprints[exp_idx]]
+	todo = [exp_idx for exp_idx in range(len(exps)) if exp_idx not in done]
+	if len(done) > 0:
+		print("Resuming \"%s\": %d of %d experiments are up to date" % (output_filename, len(done), len(exps)))
+	# Cost and estimate of the experiments that are up to date (for the pre-filter)
+	stored = {}
+	for exp_idx in done:
+		row = results_db.get_experiment(output_filename, exps[exp_idx]["exp_name"], ["total_area", "estimated_latency", "estimated_throughput"])[0]
+		stored[exp_idx] = {"total_area" : row["total_area"], "estimate" : {"latency" : row["estimated_latency"], "throughput" : row["estimated_throughput"]}}
+		if on_stored != None:
+			on_stored(results_db.get_experiment(output_filename, exps[exp_idx]["exp_name"], parameters + outputs))
+	# Number of simulations run in search mode and needed by the load grid and resource usage per stage
+	counters = {"n_sims" : 0, "n_grid" : 0}
+	total_usage = {}
+	# Store results of all combinations in database and update csv file (after the previous experiment)
+	def store_stage(exp_idx, position, chips, selected, simulated, previous = None):
+		exp = exps[exp_idx]
+		usage = {stage : scheduler.usage["%s-%d" % (stage, exp_idx)] for stage in ["generate", "translate", "simulate"] if "%s-%d" % (stage, exp_idx) in scheduler.usage}
+		usage.update(chips[position]["usage"] if chips != None else {})
+		for stage in usage:
+			total_usage.setdefault(stage, []).append(usage[stage])
+		# A failed stage of this experiment (or of the selection) is recorded as one row per combination
+		# of traffic and routing without fingerprint, such that it is run again when resuming
+		if simulated == None:
+			failure = [scheduler.failures[task] for task in store_dependencies[exp_idx] if task in scheduler.failures][0]
+			failures[exp_idx] = failure
+			rows = []
+			for traffic in (exp["traffic"] if type(exp["traffic"]) == list else [exp["traffic"]]):
+				for routing in (exp["routing"] if type(exp["routing"]) == list else [exp["routing"]]):
+					values = {param : exp[param] if type(exp[param]) in [int, float, str] else str(exp[param]) for param in parameters}
+					values.update({"traffic" : traffic, "routing" : routing, "status" : "failed", "error" : str(failure)})
+					rows.append(values)
+		else:
+			chip = chips[position]
+			(batch_results, n_sims, n_grid) = simulated
+			counters["n_sims"] += n_sims
+			counters["n_grid"] += n_grid
+			rows = []
+			for (traffic, routing) in batch_results:
+				results = get_results(exp, chip, chip["estimate"], exp_idx in selected, batch_results[(traffic, routing)])
+				values = {param : exp[param] if type(exp[param]) in [int, float, str] else str(exp[param]) for param in parameters}
+				values.update({"traffic" : traffic, "routing" : routing})
+				values.update({res : results[res] for res in outputs})
+				values["fingerprint"] = fingerprints[exp_idx]
+				rows.append(values)
+		results_db.store_experiment(output_filename, exp_idx, rows, usage)
+		results_db.export_experiments(output_filename, parameters + outputs, cfg.eval_results + output_filename + ".csv")
+		if on_stored != None:
+			on_stored([{col : row.get(col) for col in parameters + outputs} for row in rows])
+	# Build dependency graph: Each layout (see get_layout_key) is generated and loaded once for the first
+	# of its experiments, each experiment is then translated, simulated and stored. The selection waits
+	# for all experiments to be loaded if the pre-filter is enabled. Store tasks are chained, such that
+	# results are written in experiment order.
+	layouts = {}
+	for exp_idx in todo:
+		layouts.setdefault(get_layout_key(exps[exp_idx]), []).append(exp_idx)
+	layouts = list(layouts.values())
+	own_workspace = workspace == None
+	workspace = Workspace(output_filename) if own_workspace else workspace
+	scheduler = Scheduler({"pnr" : n_pnr, "sim" : n_sim}, workspace.activate, pools)
+	store_dependencies = {}
+	positions = {}
+	failures = {}
+	for group in layouts:
+		scheduler.add(Task("generate-%d" % group[0], "pnr", generate_stage, (exps[group[0]],)))
+		scheduler.add(Task("load-%d" % group[0], "pnr", load_stage, ([exps[exp_idx] for exp_idx in group],), ["generate-%d" % group[0]]))
+	scheduler.add(Task("select", None, select_stage, (exps, prefilter, stored, layouts if prefilter != None else []), \
+					   ["load-%d" % group[0] for group in layouts] if prefilter != None else [], allow_failed = True))
+	for group in layouts:
+		for (position, exp_idx) in enumerate(group):
+			scheduler.add(Task("translate-%d" % exp_idx, "pnr", translate_stage, (exps[exp_idx], exp_idx, position), ["load-%d" % group[0], "select"]))
+			scheduler.add(Task("simulate-%d" % exp_idx, "sim", simulate_stage, (exps[exp_idx], settings), ["translate-%d" % exp_idx]))
+			store_dependencies[exp_idx] = ["load-%d" % group[0], "select", "simulate-%d" % exp_idx]
+			positions[exp_idx] = position
+	for (i, exp_idx) in enumerate(todo):
+		previous = ["store-%d" % todo[i - 1]] if i > 0 else []
+		scheduler.add(Task("store-%d" % exp_idx, None, store_stage, (exp_idx, positions[exp_idx]), store_dependencies[exp_idx] + previous, allow_failed = True))
+	start = time.time()
+	with workspace:
+		scheduler.run()
+	if own_workspace:
+		workspace.collect() if collect else 0
+		workspace.remove()
+	results_db.export_columnar(output_filename, parameters + outputs, cfg.eval_results + output_filename)
+	results_db.export_stage_timings(output_filename, cfg.eval_results + output_filename + "_stages.csv")
+	print_usage_summary(total_usage, time.time() - start)
+
+	# Report experiments that failed
+	if len(failures) > 0:
+		print("%d of %d experiments failed:" % (len(failures), len(todo)))
+		for exp_idx in sorted(failures):
+			print("%s: %s" % (exps[exp_idx]["exp_name"], failures[exp_idx]))
 
+	# Report simulations saved by the saturation search
+	if search:
+		print("Saturation search used %d BookSim simulations (load grid: %d, saved: %d)" % (counters["n_sims"], counters["n_grid"], counters["n_grid"] - counters["n_sims"]))
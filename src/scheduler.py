@@ -0,0 +1,99 @@
+# Libraries
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Custom files
+from instrumentation import measure
+from error import error, ToolchainError
+
+# Node of a dependency graph
+# name:			Unique name of the task
+# pool:			Name of the process pool that runs the task (None = run in the scheduling process)
+# function:		Function to run, called with the arguments followed by the results of all dependencies
+# dependencies:	Names of the tasks that need to complete before this task can start
+# allow_failed:	Run the task even if some of its dependencies failed (None is passed as their result)
+class Task:
+	def __init__(self, name, pool, function, args = (), dependencies = [], allow_failed = False):
+		self.name = name
+		self.pool = pool
+		self.function = function
+		self.args = args
+		self.dependencies = dependencies
+		self.allow_failed = allow_failed
+
+# Runs a graph of tasks: Every task whose dependencies completed is started on its process pool,
+# tasks become ready in the order in which they were added. The results and resource usage (see
+# instrumentation.measure) of completed tasks are available in results and usage (indexed by task name).
+# A task that raises a ToolchainError fails, the error is available in failures (indexed by task name).
+# Tasks that depend on a failed task fail with the same error without being run (unless they allow
+# failed dependencies), all other tasks are not affected.
+# limits:		Maximum number of concurrent processes for each pool
+# initializer:	Function that is called in the worker process before each task (None = no initialization)
+# pools:		Process pools that outlive the scheduler, e.g. warm workers of a service (None = create a
+#				pool for each entry of limits and shut it down at the end)
+class Scheduler:
+	def __init__(self, limits, initializer = None, pools = None):
+		self.limits = limits
+		self.initializer = initializer
+		self.shared_pools = pools
+		self.tasks = []
+		self.results = {}
+		self.usage = {}
+		self.failures = {}
+
+	# Add a task (dependencies need to be added first)
+	def add(self, task):
+		names = [other.name for other in self.tasks]
+		for dep in task.dependencies:
+			if dep not in names:
+				msg = "Task \"%s\" depends on unknown task \"%s\""
+				msg %= (task.name, dep)
+				error(__file__, msg)
+		self.tasks.append(task)
+
+	# Run all tasks and return their results
+	def run(self):
+		pools = self.shared_pools if self.shared_pools != None else {pool : ProcessPoolExecutor(max_workers = self.limits[pool]) for pool in self.limits}
+		try:
+			pending = list(self.tasks)
+			running = {}
+			while len(pending) > 0 or len(running) > 0:
+				# Start all ready tasks, tasks in the scheduling process run right away
+				ready = [task for task in pending if all([dep in self.results or dep in self.failures for dep in task.dependencies])]
+				for task in ready:
+					pending.remove(task)
+					failed = [dep for dep in task.dependencies if dep in self.failures]
+					if len(failed) > 0 and not task.allow_failed:
+						self.failures[task.name] = self.failures[failed[0]]
+						continue
+					args = tuple(task.args) + tuple([self.results.get(dep) for dep in task.dependencies])
+					if task.pool == None:
+						try:
+							(self.results[task.name], self.usage[task.name]) = measure(task.function, *args)
+						except ToolchainError as err:
+							self.failures[task.name] = err
+					else:
+						running[pools[task.pool].submit(run_task, self.initializer, task.function, *args)] = task
+				if any([task.name in self.results or task.name in self.failures for task in ready]):
+					continue
+				# Wait for the next task to complete
+				(done, not_done) = wait(running, return_when = FIRST_COMPLETED)
+				for future in done:
+					task = running.pop(future)
+					try:
+						(self.results[task.name], self.usage[task.name]) = future.result()
+					except ToolchainError as err:
+						self.failures[task.name] = err
+		finally:
+			if self.shared_pools == None:
+				for pool in pools.values():
+					pool.shutdown(cancel_futures = True)
+			else:
+				for future in running:
+					future.cancel()
+		return self.results
+
+# Run a task in a worker process (after initializing the process) and measure its resource usage
+def run_task(initializer, function, *args):
+	if initializer != None:
+		initializer()
+	return measure(function, *args)
@@ -0,0 +1,65 @@
+# Libraries
+import hashlib
+import os
+import re
+import threading
+
+# Custom files
+import config as cfg
+
+# Hashes of files that are read many times (BookSim binary), indexed by path, size and modification time
+file_hashes = {}
+
+# Compute the hash of a file's content
+def hash_file(path):
+	stat = os.stat(path)
+	idx = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+	if idx not in file_hashes:
+		with open(path, "rb") as file:
+			file_hashes[idx] = hashlib.sha256(file.read()).hexdigest()
+	return file_hashes[idx]
+
+# Read a BookSim configuration file into a dictionary
+def read_config(path):
+	with open(path, "r") as cfg_file:
+		content = re.sub(r"//[^\n]*", "", cfg_file.read())
+	params = {}
+	for statement in content.split(";"):
+		if "=" in statement:
+			(key, value) = statement.split("=", 1)
+			params[key.strip()] = value.strip()
+	return params
+
+# Compute the cache key of a BookSim invocation
+# args:		Command line (binary, configuration file, parameter overrides)
+# The key covers the BookSim binary, the effective configuration (configuration file with all
+# overrides applied) and the content of the anynet file but not its path.
+def get_key(args):
+	params = read_config(args[1])
+	for arg in args[2:]:
+		(key, value) = arg.split("=", 1)
+		params[key.strip()] = value.strip()
+	network_file = params.pop("network_file")
+	key = hashlib.sha256()
+	key.update(hash_file(args[0]).encode())
+	key.update(hash_file(network_file).encode())
+	for param in sorted(params):
+		key.update(("%s=%s;" % (param, params[param])).encode())
+	return key.hexdigest()
+
+# Return the cached output of a BookSim invocation or None if there is no cache entry
+def load(key):
+	path = cfg.bs_cache + key + ".out"
+	if not os.path.exists(path):
+		return None
+	with open(path, "r") as cache_file:
+		return cache_file.read()
+
+# Store the output of a BookSim invocation
+def store(key, output):
+	path = cfg.bs_cache + key + ".out"
+	# Write to temporary file first such that concurrent readers never see partial entries
+	tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+	with open(tmp_path, "w") as cache_file:
+		cache_file.write(output)
+	os.replace(tmp_path, path)
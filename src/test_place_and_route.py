@@ -0,0 +1,31 @@
+# Libraries
+import numpy as np
+
+# Custom files
+import place_and_route as par
+
+# Straight route through the cells 1 ... 4 of a row (the end points are the ports)
+def get_row_route(row):
+	return [(row, 0), (row, 5)]
+
+# Cumulative usage of a 3x6 fine grid with the given routes
+def get_usage(routes):
+	cums = par.create_cumulative_usage(3, 6)
+	for route in routes:
+		for (typ, fix, start, end, step) in par.get_route_spans(route):
+			par.add_span(cums[0 if typ == "H" else 1][fix], start, end, step)
+	return cums
+
+# The routes of the best iteration are restored (with their usage) if the last iteration is worse
+def test_negotiation_restores_best_iteration(monkeypatch):
+	# Three routes share row 1 (8 collisions). Iteration 1 moves two of them to row 0 (4 collisions),
+	# iteration 2 moves both back (8 collisions) and ends the negotiation.
+	reroutes = iter([get_row_route(row) for row in [0, 1, 0, 1, 1]])
+	monkeypatch.setattr(par, "search_route", lambda *args : (next(reroutes), 0, 0))
+	greedy = [get_row_route(1)] * 3
+	(routes, cums) = par.negotiate_congestion([0, 1, 2], greedy, get_usage(greedy), None, None, None, None, 10)
+	assert routes == [get_row_route(0), get_row_route(1), get_row_route(0)]
+	assert par.count_collisions(cums) == 4
+	for (cum, expected) in zip(cums, get_usage(routes)):
+		assert np.array_equal(cum, expected)
+	assert next(reroutes, None) == None
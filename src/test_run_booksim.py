@@ -0,0 +1,38 @@
+# Libraries
+import time
+
+# Custom files
+import run_booksim
+
+# Statistics of a fake simulation that reports the given latency
+class FakeStats:
+	def __init__(self, latency):
+		self.status = "ok"
+		self.latency = latency
+
+	def get_latency(self, traffic_class = 0):
+		return self.latency
+
+# Fine loads below saturation, the latency rises from 63 (more than twice the zero-load latency of 20)
+loads = [round(0.41 + 0.01 * i, 2) for i in range(9)]
+latencies = {load : 63 + 100 * (load - 0.41) for load in loads}
+
+# Run a speculative sweep in which the simulations finish in the order of the given delays
+def run_sweep(monkeypatch, delays, zero_load_latency):
+	def simulate_replicated(topo, traffic, routing, load, cancel, n_seeds):
+		time.sleep(delays[load])
+		return (FakeStats(latencies[load]), "")
+	monkeypatch.setattr(run_booksim, "simulate_replicated", simulate_replicated)
+	results = run_booksim.simulate_loads_speculative("topo", "uniform", "min", loads, len(loads), zero_load_latency)
+	return {load : results[load][0].latency for load in results}
+
+# The given zero-load latency decides saturation, no matter in which order the simulations finish
+def test_speculative_sweep_does_not_depend_on_timing(monkeypatch):
+	in_order = run_sweep(monkeypatch, {load : 0.02 * i for (i, load) in enumerate(loads)}, 20)
+	reversed_order = run_sweep(monkeypatch, {load : 0.02 * (len(loads) - i) for (i, load) in enumerate(loads)}, 20)
+	assert in_order == reversed_order == {0.41 : latencies[0.41]}
+
+# Without a zero-load latency, the latency at the lowest load is the reference
+def test_speculative_sweep_uses_lowest_load_without_zero_load_latency(monkeypatch):
+	results = run_sweep(monkeypatch, {load : 0.02 * (len(loads) - i) for (i, load) in enumerate(loads)}, None)
+	assert results == latencies
@@ -132,13 +132,19 @@ class Tile:
 		self.vertices += [(i,"sp") for i in range(len(self.slave_ports))]
 		self.vertices += [(i,"p") for i in range(len(self.phys))]
 		self.edges = [con for con in self.internal_connections]	
-		delay = self.n_rows * ucell.delay_v_in_cycles / 2 + self.n_cols * ucell.delay_h_in_cycles / 2 
-		self.edge_delays = {edge : delay for edge in self.edges}
+		self.set_frequency(self.frequency)
 
 		# MODEL
 		self.total_area_in_mm2 = self.n_rows * self.n_cols * ucell.area_in_mm2
 		self.total_power_in_w = self.n_rows * self.n_cols * ucell.logic_power_in_w
 
+	# Change the clock frequency: Only the edge delays depend on it (the grid, area and power do not)
+	def set_frequency(self, frequency):
+		self.frequency = frequency
+		ucell = UnitCell(self.technology, self.protocol, self.bandwidth, self.frequency)
+		delay = self.n_rows * ucell.delay_v_in_cycles / 2 + self.n_cols * ucell.delay_h_in_cycles / 2 
+		self.edge_delays = {edge : delay for edge in self.edges}
+
 	# Function to mirror a tile
 	def mirror(self, xmirror, ymirror):
 		# Mirror grid
@@ -7,10 +7,9 @@ from module import Module
 from stacked_chip import StackedChip
 from error import error, warning
 
-# Translate a logical model to an anynet BookSim input
-def translate_lm_to_bs(output_file_name, vertices, edges, edge_delays):
-
-	print("Translating Logical Model to BookSim anynet file...", end = '')
+# Reduce a logical model to its routers and endpoints: Returns the lists of routers and endpoints and
+# for each router its successors (routers and endpoints) together with the delay to reach them
+def get_router_graph(vertices, edges, edge_delays):
 	# Step 1: Construct auxiliary data structures
 	adj_list = {}
 	router_list = []
@@ -24,7 +23,7 @@ def translate_lm_to_bs(output_file_name, vertices, edges, edge_delays):
 	for (s,e) in edges:
 		adj_list[s].append(e)
 	# Step 2: Only keep routers and endpoints
-	f = open(cfg.bs_topologies + output_file_name + ".anynet", "w")
+	successors = {}
 	for router in router_list:
 		succ_routers = []
 		succ_nodes = []
@@ -41,11 +40,21 @@ def translate_lm_to_bs(output_file_name, vertices, edges, edge_delays):
 					succ_nodes.append(nei)
 				else:
 					todo.append(nei)
-		# Step 3: Write anynet topology 
+		successors[router] = [(succ, dist[succ]) for succ in succ_routers + succ_nodes]
+	return (router_list, endpoint_list, successors)
+
+# Translate a logical model to an anynet BookSim input
+def translate_lm_to_bs(output_file_name, vertices, edges, edge_delays):
+
+	print("Translating Logical Model to BookSim anynet file...", end = '')
+	(router_list, endpoint_list, successors) = get_router_graph(vertices, edges, edge_delays)
+	# Step 3: Write anynet topology 
+	f = open(cfg.bs_topologies + output_file_name + ".anynet", "w")
+	for router in router_list:
 		f.write("router " + str(router_list.index(router)))
-		for succ in succ_routers + succ_nodes:
+		for (succ, delay) in successors[router]:
 			if succ[-1] == "r":
-				f.write(" router " + str(router_list.index(succ)) + " " + str(max(1,int(round(dist[succ])))))	
+				f.write(" router " + str(router_list.index(succ)) + " " + str(max(1,int(round(delay)))))	
 			elif succ[-1] in ["ep"]: 
 				f.write(" node " + str(endpoint_list.index(succ)))	
 		f.write("\n")
@@ -0,0 +1,102 @@
+# Libraries
+import os
+import shutil
+import tempfile
+
+# Custom files
+from error import warning
+import config as cfg
+
+# Layout of a workspace: Location of the paths from config.py relative to the root of the workspace
+# Artifacts of a run (created inside of the workspace)
+artifact_layout = {
+	"unembedded_tile_path" : "components/tiles/",
+	"tile_path" : "components_embedded/tiles/",
+	"module_path" : "components_embedded/modules/",
+	"stacked_chip_path" : "components_embedded/stacked_chips/",
+	"bs_topologies" : "booksim2/src/anynet/",
+	"bs_results" : "bs_results/",
+	"bs_logs" : "bs_logs/",
+}
+# Shared read-only inputs (symbolic links to the inputs of the enclosing workspace or the repository)
+input_layout = {
+	"technology_path" : "inputs/technologies/",
+	"protocol_path" : "inputs/protocols/",
+	"interposer_path" : "inputs/interposers/",
+	"experiment_path" : "inputs/experiments/",
+	"bs_binary" : "booksim2/src/booksim",
+	"bs_config" : "booksim2/src/anynet.conf",
+}
+# The cache of BookSim outputs, the results database, the evaluation results and the plots are shared
+# by all runs: Cache entries are written atomically, the database handles concurrent writers and the
+# results and plots are named after their output.
+
+# Isolated directory for the artifacts of a run: Tiles, modules, anynet files and BookSim logs are
+# named after their chip only, hence concurrent runs (or users) need to place them in different
+# directories. While a workspace is active, the paths in config.py point into it.
+# name:		Prefix of the directory name
+# base:		Directory in which the workspace is created (None = directory for temporary files)
+# tmpfs:	Create the workspace in memory (/dev/shm) if possible
+# keep:		Keep the directory when the workspace is removed (for inspection)
+class Workspace:
+	def __init__(self, name = "run", base = None, tmpfs = False, keep = False):
+		if tmpfs:
+			if os.path.isdir("/dev/shm"):
+				base = "/dev/shm"
+			else:
+				msg = "No tmpfs available at /dev/shm, workspace \"%s\" is created on disk"
+				msg %= name
+				warning(__file__, msg)
+		self.root = tempfile.mkdtemp(prefix = name + "_", dir = base) + "/"
+		self.keep = keep
+		self.paths = {}
+		self.previous = None
+		for (path, location) in artifact_layout.items():
+			self.paths[path] = self.root + location
+			os.makedirs(self.paths[path], exist_ok = True)
+		for (path, location) in input_layout.items():
+			self.paths[path] = self.root + location
+			target = getattr(cfg, path).rstrip("/")
+			os.makedirs(os.path.dirname(self.paths[path].rstrip("/")), exist_ok = True)
+			if os.path.exists(target):
+				os.symlink(os.path.abspath(target), self.paths[path].rstrip("/"))
+
+	# Point the paths in config.py into this workspace (also used to initialize worker processes)
+	def activate(self):
+		self.previous = {path : getattr(cfg, path) for path in self.paths}
+		for path in self.paths:
+			setattr(cfg, path, self.paths[path])
+
+	# Restore the paths that were used before the workspace was activated
+	def deactivate(self):
+		if self.previous != None:
+			for path in self.previous:
+				setattr(cfg, path, self.previous[path])
+			self.previous = None
+
+	# Copy the artifacts of the workspace into the directories that config.py pointed to before the workspace
+	# was activated (or points to if it is not active), existing files of the same name are overwritten
+	def collect(self):
+		targets = self.previous if self.previous != None else {path : getattr(cfg, path) for path in self.paths}
+		for path in artifact_layout:
+			shutil.copytree(self.paths[path], targets[path], dirs_exist_ok = True)
+
+	# Delete the directory of the workspace (unless it is kept)
+	def remove(self):
+		self.deactivate()
+		if not self.keep:
+			shutil.rmtree(self.root, ignore_errors = True)
+
+	def __enter__(self):
+		self.activate()
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.deactivate()
+		return False
+
+	# Workspaces are passed to worker processes, which activate them independently
+	def __getstate__(self):
+		state = dict(self.__dict__)
+		state["previous"] = None
+		return state